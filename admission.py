@@ -0,0 +1,178 @@
+"""
+Admission control for uploads.
+
+Uploads are admitted before their body is read, based on ``Content-Length``,
+so a burst of large uploads can't all be spooled and materialized at once.
+``UploadAdmission`` bounds both the number of uploads in flight and the bytes
+they may hold; requests beyond that wait in a FIFO queue until a deadline and
+are then turned away with 503 and ``Retry-After``.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Tuple
+
+from fastapi.responses import JSONResponse
+
+
+class AdmissionRejected(Exception):
+    """Raised when an upload can't be admitted in time"""
+
+
+class UploadAdmission:
+    """Bounded upload concurrency with a FIFO wait queue"""
+
+    def __init__(self, max_uploads: int, max_bytes: int, max_queue: int,
+                 queue_timeout: float, retry_after: int):
+        self.max_uploads = max_uploads
+        self.max_bytes = max_bytes
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._in_flight_bytes = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+        # Counters for /status
+        self._admitted = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def reservation(self, size: int) -> int:
+        """Bytes to reserve for an upload; oversized uploads run alone"""
+        return min(size, self.max_bytes)
+
+    def _fits(self, size: int) -> bool:
+        return (self._in_flight < self.max_uploads
+                and self._in_flight_bytes + size <= self.max_bytes)
+
+    def _grant(self, size: int) -> None:
+        self._in_flight += 1
+        self._in_flight_bytes += size
+
+    def _wake(self) -> None:
+        # Strict FIFO: a large upload at the head isn't overtaken by small ones
+        while self._waiters:
+            size, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._fits(size):
+                break
+            self._waiters.popleft()
+            self._grant(size)
+            future.set_result(None)
+
+    def _record_wait(self, waited: float) -> None:
+        self._admitted += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+
+    async def acquire(self, size: int) -> None:
+        """Wait until the upload may proceed; call release(size) afterwards"""
+        if not self._waiters and self._fits(size):
+            self._grant(size)
+            self._record_wait(0.0)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._rejected += 1
+            raise AdmissionRejected("Upload queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (size, future)
+        self._waiters.append(entry)
+        start = time.monotonic()
+        try:
+            await asyncio.wait({future}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # Client went away while queued; hand back anything already granted
+            if future.done():
+                self.release(size)
+            else:
+                future.cancel()
+                self._waiters.remove(entry)
+                self._wake()
+            raise
+
+        if not future.done():
+            future.cancel()
+            self._waiters.remove(entry)
+            self._rejected += 1
+            self._wake()
+            raise AdmissionRejected("Timed out waiting for an upload slot")
+
+        self._record_wait(time.monotonic() - start)
+
+    def release(self, size: int) -> None:
+        self._in_flight -= 1
+        self._in_flight_bytes -= size
+        self._wake()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_uploads,
+            "in_flight_bytes": self._in_flight_bytes,
+            "max_in_flight_bytes": self.max_bytes,
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._total_wait / self._admitted * 1000, 1) if self._admitted else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 1)
+        }
+
+
+class UploadAdmissionMiddleware:
+    """ASGI middleware admitting POST requests to an upload path"""
+
+    def __init__(self, app, controller: UploadAdmission, max_request_bytes: int, path: str = "/upload"):
+        self.app = app
+        self.controller = controller
+        self.max_request_bytes = max_request_bytes
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    content_length = int(value)
+                except ValueError:
+                    pass
+                break
+
+        if content_length is not None and content_length > self.max_request_bytes:
+            response = JSONResponse(
+                {"detail": "File too large. Request body exceeds the maximum upload size"},
+                status_code=413
+            )
+            await response(scope, receive, send)
+            return
+
+        # Without a Content-Length, assume the largest allowed upload
+        size = self.controller.reservation(
+            content_length if content_length is not None else self.max_request_bytes
+        )
+        try:
+            await self.controller.acquire(size)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                {"detail": f"Server busy: {e}. Please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(self.controller.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(size)
@@ -0,0 +1,312 @@
+"""
+mmap-backed payload arena.
+
+Storing each payload as its own ``bytes`` object leaves the malloc heap
+fragmented after large uploads expire, so RSS stays well above the logical
+size of the stored files. ``PayloadArena`` keeps payloads outside the Python
+heap instead:
+
+- Payloads up to ``large_threshold`` go into fixed-size slots of shared
+  memory slabs, one slab list per size class (64 B up to the threshold,
+  each class about 1.5x the previous one). Freed slots have their whole pages
+  handed back to the OS with ``madvise``, and empty slabs are unmapped.
+- Larger payloads get a dedicated region that is unmapped when freed.
+
+Regions are anonymous memory (``memfd``) or files in ``backing_dir``.
+Downloads read through their own read-only mapping of the region, so a
+slot is only recycled once every memoryview handed to a reader (including
+ones still queued in a transport's write buffer) has been released. Other
+processes (preview workers) map a block through ``/proc`` instead of
+receiving a copy of it.
+"""
+
+import mmap
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+PAGE_SIZE = mmap.PAGESIZE
+MAP_GRANULARITY = mmap.ALLOCATIONGRANULARITY
+# MADV_REMOVE frees shared memory and punches holes in files; MADV_DONTNEED
+# only drops the mapping's pages, which is all anonymous private memory needs
+RELEASE_ADVICE = getattr(mmap, "MADV_REMOVE", getattr(mmap, "MADV_DONTNEED", None))
+MIN_SLOT_SIZE = 64
+# Where other processes can open this process's file descriptors (Linux)
+PROC_FD_DIR = "/proc/self/fd"
+
+
+def size_classes(limit: int) -> List[int]:
+    """Slot sizes from MIN_SLOT_SIZE to limit, alternating x1.5 and x(4/3)"""
+    classes = []
+    size = MIN_SLOT_SIZE
+    while size < limit:
+        classes.append(size)
+        if size * 3 // 2 < limit:
+            classes.append(size * 3 // 2)
+        size *= 2
+    classes.append(limit)
+    return classes
+
+
+class Region:
+    """A shared memory region with a writable mapping"""
+
+    __slots__ = ("fd", "size", "map")
+
+    def __init__(self, size: int, backing_dir: Optional[str]):
+        size = -(-size // PAGE_SIZE) * PAGE_SIZE
+        if backing_dir is None and hasattr(os, "memfd_create"):
+            fd = os.memfd_create("payload-arena", os.MFD_CLOEXEC)
+        else:
+            fd, path = tempfile.mkstemp(prefix="payload-arena-", dir=backing_dir)
+            os.unlink(path)  # Storage lives until the last mapping is closed
+        try:
+            os.ftruncate(fd, size)
+            self.map = mmap.mmap(fd, size)
+        except Exception:
+            os.close(fd)
+            raise
+        self.fd = fd
+        self.size = size
+
+    def release_pages(self, offset: int, length: int) -> None:
+        """Return the whole pages inside [offset, offset + length) to the OS"""
+        start = -(-offset // PAGE_SIZE) * PAGE_SIZE
+        end = (offset + length) // PAGE_SIZE * PAGE_SIZE
+        if RELEASE_ADVICE is None or end <= start:
+            return
+        try:
+            self.map.madvise(RELEASE_ADVICE, start, end - start)
+        except OSError:
+            self.map.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    def close(self) -> None:
+        # Readers map the fd themselves, so this can't fail on their exports
+        self.map.close()
+        os.close(self.fd)
+
+
+class Slab:
+    """A region cut into equal slots of one size class"""
+
+    __slots__ = ("region", "slot_size", "free", "used")
+
+    def __init__(self, region: Region, slot_size: int):
+        self.region = region
+        self.slot_size = slot_size
+        # Pop from the end so the lowest slots are reused first
+        self.free = list(range(region.size // slot_size - 1, -1, -1))
+        self.used = 0
+
+
+class ArenaBlock:
+    """Handle to one payload stored in the arena"""
+
+    __slots__ = ("_arena", "_region", "_slab", "offset", "length", "_readers", "_freed")
+
+    def __init__(self, arena: "PayloadArena", region: Region, slab: Optional[Slab], offset: int, length: int):
+        self._arena = arena
+        self._region = region
+        self._slab = slab
+        self.offset = offset
+        self.length = length
+        self._readers: List[mmap.mmap] = []
+        self._freed = False
+
+    def __len__(self) -> int:
+        return self.length
+
+    def write(self, position: int, data) -> None:
+        """Copy data into the block starting at position"""
+        start = self.offset + position
+        self._region.map[start:start + len(data)] = data
+
+    def tobytes(self) -> bytes:
+        return self._region.map[self.offset:self.offset + self.length]
+
+    def open_view(self) -> memoryview:
+        """Read-only view of the payload through a mapping private to this reader
+
+        Call close_readers() when done; the view stays valid until released
+        even if the block is freed meanwhile. Open it before handing the block
+        to anything that may run after a free, since a freed block's slot can
+        already hold another payload.
+        """
+        with self._arena._lock:
+            if self._freed:
+                raise ValueError("Block has been freed")
+            return self._open_view()
+
+    def _open_view(self) -> memoryview:
+        if self.length == 0:
+            return memoryview(b"")
+        # Map under the lock so free() can't release the region in between
+        aligned = self.offset - self.offset % MAP_GRANULARITY
+        reader = mmap.mmap(self._region.fd, self.offset - aligned + self.length,
+                           offset=aligned, access=mmap.ACCESS_READ)
+        self._readers.append(reader)
+        self._arena._reading.add(self)
+        return memoryview(reader)[self.offset - aligned:]
+
+    def open_shared(self) -> Optional["SharedBlock"]:
+        """Pin the payload so another process can map it by path
+
+        Returns None where the OS offers no such path. Close the result once
+        the other process is done; until then the slot isn't recycled and the
+        region stays alive even if the block is freed.
+        """
+        if not os.path.isdir(PROC_FD_DIR):
+            return None
+        with self._arena._lock:
+            if self._freed:
+                raise ValueError("Block has been freed")
+            view = self._open_view()
+            # A private fd: the region's own fd is closed when a dedicated
+            # region is freed, and its number may then be reused
+            fd = os.dup(self._region.fd)
+        return SharedBlock(self, view, fd)
+
+    def close_readers(self) -> bool:
+        """Unmap reader mappings whose views were released; True if none remain"""
+        with self._arena._lock:
+            return self._arena._close_readers(self)
+
+
+class SharedBlock:
+    """A block pinned for reading by another process"""
+
+    __slots__ = ("path", "offset", "length", "_block", "_view", "_fd")
+
+    def __init__(self, block: ArenaBlock, view: memoryview, fd: int):
+        self.path = f"/proc/{os.getpid()}/fd/{fd}"
+        self.offset = block.offset
+        self.length = block.length
+        self._block = block
+        self._view = view
+        self._fd = fd
+
+    def close(self) -> None:
+        if self._fd < 0:
+            return
+        self._view.release()
+        os.close(self._fd)
+        self._fd = -1
+        self._block.close_readers()
+
+
+class PayloadArena:
+    """Size-class slab allocator over shared memory regions"""
+
+    def __init__(self, slab_size: int = 4 * 1024 * 1024, large_threshold: int = 1024 * 1024,
+                 backing_dir: Optional[str] = None):
+        self.slab_size = slab_size
+        self.large_threshold = large_threshold
+        self.backing_dir = backing_dir
+        self._classes = size_classes(large_threshold)
+        self._slabs: Dict[int, List[Slab]] = {size: [] for size in self._classes}
+        self._large: Dict[int, Region] = {}
+        self._reading = set()  # Blocks with reader mappings still open
+        self._pending_free: List[ArenaBlock] = []  # Freed blocks still being read
+        self._lock = threading.Lock()
+        self._used_bytes = 0
+
+    def _slot_size(self, size: int) -> int:
+        for slot_size in self._classes:
+            if size <= slot_size:
+                return slot_size
+        raise ValueError("Size exceeds the slab limit")
+
+    def allocate(self, size: int) -> ArenaBlock:
+        """Reserve space for a payload of size bytes"""
+        with self._lock:
+            self._reclaim()
+
+            if size > self.large_threshold:
+                region = Region(size, self.backing_dir)
+                self._large[id(region)] = region
+                self._used_bytes += size
+                return ArenaBlock(self, region, None, 0, size)
+
+            slot_size = self._slot_size(max(size, 1))
+            slabs = self._slabs[slot_size]
+            slab = next((s for s in slabs if s.free), None)
+            if slab is None:
+                region_size = max(self.slab_size, slot_size * 4)
+                slab = Slab(Region(region_size, self.backing_dir), slot_size)
+                slabs.append(slab)
+            slot = slab.free.pop()
+            slab.used += 1
+            self._used_bytes += size
+            return ArenaBlock(self, slab.region, slab, slot * slot_size, size)
+
+    def free(self, block: ArenaBlock) -> None:
+        """Release a block; its slot is recycled once all readers are done"""
+        with self._lock:
+            if block._freed:
+                return
+            block._freed = True
+            self._used_bytes -= block.length
+            # Readers of a dedicated region hold their own mappings of it, so
+            # only slab slots (which get reused) have to wait for them
+            if self._close_readers(block) or block._slab is None:
+                self._release(block)
+            else:
+                self._pending_free.append(block)
+            self._reclaim()
+
+    def reclaim(self) -> None:
+        """Close finished reader mappings and recycle deferred frees"""
+        with self._lock:
+            self._reclaim()
+
+    def _close_readers(self, block: ArenaBlock) -> bool:
+        open_readers = []
+        for reader in block._readers:
+            try:
+                reader.close()
+            except BufferError:  # A memoryview into it is still alive
+                open_readers.append(reader)
+        block._readers = open_readers
+        if not open_readers:
+            self._reading.discard(block)
+        return not open_readers
+
+    def _reclaim(self) -> None:
+        for block in list(self._reading):
+            self._close_readers(block)
+        if self._pending_free:
+            still_pending = []
+            for block in self._pending_free:
+                if block._readers:  # Closed by the sweep above once released
+                    still_pending.append(block)
+                else:
+                    self._release(block)
+            self._pending_free = still_pending
+
+    def _release(self, block: ArenaBlock) -> None:
+        slab = block._slab
+        if slab is None:
+            self._large.pop(id(block._region)).close()
+            return
+
+        slab.region.release_pages(block.offset, slab.slot_size)
+        slab.free.append(block.offset // slab.slot_size)
+        slab.used -= 1
+        slabs = self._slabs[slab.slot_size]
+        # Unmap empty slabs, keeping one per size class to avoid churn
+        if slab.used == 0 and len(slabs) > 1:
+            slabs.remove(slab)
+            slab.region.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            slabs = [slab for slabs in self._slabs.values() for slab in slabs]
+            return {
+                "used_bytes": self._used_bytes,
+                "mapped_bytes": (sum(slab.region.size for slab in slabs)
+                                 + sum(region.size for region in self._large.values())),
+                "slabs": len(slabs),
+                "large_regions": len(self._large),
+                "pending_frees": len(self._pending_free)
+            }
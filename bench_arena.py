@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Soak benchmark: RSS vs logical usage over many upload/expire cycles,
+with payloads stored as bytes on the heap vs in the mmap payload arena
+
+Usage: python bench_arena.py [cycles] [working_set_mb]   (default: 5000 200)
+"""
+
+import os
+import random
+import subprocess
+import sys
+import time
+
+from arena import PayloadArena
+
+CHUNK_SIZE = 1024 * 1024  # Matches UPLOAD_CHUNK_SIZE in main.py
+SOURCE_SIZE = 32 * 1024 * 1024
+REPORT_EVERY = 500
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+
+def random_size(rng: random.Random) -> int:
+    """Mostly small shares, some medium, a few large"""
+    roll = rng.random()
+    if roll < 0.70:
+        return rng.randint(100, 64 * 1024)
+    if roll < 0.95:
+        return rng.randint(64 * 1024, 2 * 1024 * 1024)
+    return rng.randint(2 * 1024 * 1024, SOURCE_SIZE)
+
+
+def upload_chunks(source: bytes, size: int, rng: random.Random):
+    """Yield upload chunks the way main.py reads them from UploadFile"""
+    start = rng.randint(0, SOURCE_SIZE - size)
+    for offset in range(0, size, CHUNK_SIZE):
+        yield source[start + offset:start + min(offset + CHUNK_SIZE, size)]
+
+
+def soak(mode: str, cycles: int, working_set: int) -> None:
+    """Run the workload in this process and print one result line per report"""
+    rng = random.Random(42)
+    source = os.urandom(SOURCE_SIZE)
+    arena = PayloadArena() if mode == "arena" else None
+    baseline = rss_bytes()
+    stored = {}
+    logical = 0
+    peak_ratio = 0.0
+    start = time.perf_counter()
+
+    for cycle in range(1, cycles + 1):
+        size = random_size(rng)
+        if arena is None:
+            content = b"".join(upload_chunks(source, size, rng))
+        else:
+            content = arena.allocate(size)
+            position = 0
+            for chunk in upload_chunks(source, size, rng):
+                content.write(position, chunk)
+                position += len(chunk)
+        stored[cycle] = content
+        logical += size
+
+        # Download a random share now and then
+        if cycle % 10 == 0:
+            content = stored[rng.choice(list(stored))]
+            view = content.open_view() if arena is not None else memoryview(content)
+            for offset in range(0, len(view), CHUNK_SIZE):
+                view[offset:offset + CHUNK_SIZE].tobytes()
+            view.release()
+            if arena is not None:
+                content.close_readers()
+
+        # Expire random shares until back under the working set
+        while logical > working_set:
+            token = rng.choice(list(stored))
+            content = stored.pop(token)
+            logical -= len(content)
+            if arena is not None:
+                arena.free(content)
+
+        if cycle % REPORT_EVERY == 0 or cycle == cycles:
+            rss = rss_bytes() - baseline
+            peak_ratio = max(peak_ratio, rss / logical if logical else 0)
+            print(f"{cycle} {logical} {rss}", flush=True)
+
+    # Expire everything and see how much memory goes back to the OS
+    for content in stored.values():
+        if arena is not None:
+            arena.free(content)
+    stored.clear()
+    print(f"end {rss_bytes() - baseline} {peak_ratio:.3f} {time.perf_counter() - start:.2f}", flush=True)
+
+
+def run_mode(mode: str, cycles: int, working_set: int) -> dict:
+    """Run one storage mode in a fresh process so RSS isn't shared"""
+    output = subprocess.run(
+        [sys.executable, __file__, "--soak", mode, str(cycles), str(working_set)],
+        capture_output=True, text=True, check=True,
+    ).stdout.split("\n")
+
+    rows = []
+    result = {"mode": mode, "rows": rows}
+    for line in output:
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == "end":
+            result["rss_after_expiry"] = int(fields[1])
+            result["peak_ratio"] = float(fields[2])
+            result["seconds"] = float(fields[3])
+        else:
+            rows.append((int(fields[0]), int(fields[1]), int(fields[2])))
+    return result
+
+
+def format_mb(bytes_size: int) -> str:
+    return f"{bytes_size / 1024 / 1024:7.1f} MB"
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--soak":
+        soak(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+        return
+
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    working_set = int(sys.argv[2]) * 1024 * 1024 if len(sys.argv) > 2 else 200 * 1024 * 1024
+    print(f"🧪 Payload storage soak ({cycles:,} upload/expire cycles, {format_mb(working_set).strip()} working set)")
+    print("=" * 60)
+
+    results = [run_mode(mode, cycles, working_set) for mode in ("heap", "arena")]
+    for result in results:
+        print(f"\n📦 {result['mode']} ({result['seconds']:.1f} s)")
+        print(f"   {'cycle':>6} {'logical':>10} {'RSS':>10} {'RSS/logical':>12}")
+        for cycle, logical, rss in result["rows"]:
+            print(f"   {cycle:>6} {format_mb(logical)} {format_mb(rss)} {rss / logical:>12.2f}")
+
+    print(f"\n{'='*60}")
+    print("📋 Summary (RSS above the pre-workload baseline)")
+    for result in results:
+        _, logical, rss = result["rows"][-1]
+        print(f"   {result['mode']:>5}: final RSS/logical {rss / logical:.2f}, "
+              f"peak {result['peak_ratio']:.2f}, "
+              f"RSS after expiring everything {format_mb(result['rss_after_expiry']).strip()}")
+
+
+if __name__ == "__main__":
+    main()
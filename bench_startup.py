@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: time from process start to the first successful
+/status, /upload and /download
+
+Usage: python bench_startup.py [runs]   (default: 5)
+"""
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+PAYLOAD = b"startup benchmark payload\n" * 64
+POLL_INTERVAL = 0.005
+
+
+def free_port() -> int:
+    """Ask the OS for an unused TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def upload(base_url: str) -> str:
+    """Upload the payload and return its download token"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="bench.txt"\r\n'
+        f"Content-Type: text/plain\r\n\r\n"
+    ).encode() + PAYLOAD + f"\r\n--{boundary}--\r\n".encode()
+    request = urllib.request.Request(
+        f"{base_url}/upload",
+        data=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    with urllib.request.urlopen(request) as response:
+        html = response.read().decode()
+    return html.split("/download/", 1)[1][:36]
+
+
+def measure_once(port: int) -> dict:
+    """Start the server and time the first successful requests"""
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, PORT=str(port))
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=APP_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            try:
+                with urllib.request.urlopen(f"{base_url}/status") as response:
+                    response.read()
+                break
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(POLL_INTERVAL)
+        status_time = time.perf_counter() - start
+
+        token = upload(base_url)
+        upload_time = time.perf_counter() - start
+
+        with urllib.request.urlopen(f"{base_url}/download/{token}") as response:
+            if response.read() != PAYLOAD:
+                raise RuntimeError("Downloaded content doesn't match upload")
+        download_time = time.perf_counter() - start
+
+        return {"status": status_time, "upload": upload_time, "download": download_time}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"🚀 Startup benchmark ({runs} runs, {sys.executable})")
+    print("=" * 60)
+
+    results = []
+    for i in range(runs):
+        result = measure_once(free_port())
+        results.append(result)
+        print(f"   Run {i+1}: /status {result['status']*1000:.0f} ms, "
+              f"/upload {result['upload']*1000:.0f} ms, "
+              f"/download {result['download']*1000:.0f} ms")
+
+    print(f"\n{'='*60}")
+    print("📋 Median time from process start")
+    for step in ("status", "upload", "download"):
+        median = statistics.median(r[step] for r in results)
+        print(f"   First /{step}: {median*1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
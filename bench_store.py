@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Memory and lookup benchmark: dict-of-dicts vs ShareStore
+
+Usage: python bench_store.py [entries]   (default: 1,000,000)
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from share_store import Share, ShareStore
+
+LOOKUPS = 200_000
+# Payloads are shared between entries so only the metadata overhead is measured
+PAYLOAD = b"x" * 64
+OWNERS = [f"192.168.1.{i}" for i in range(1, 255)]
+
+
+def format_size(bytes_size: float) -> str:
+    """Format byte count in human readable format"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if bytes_size < 1024.0:
+            return f"{bytes_size:.1f} {unit}"
+        bytes_size /= 1024.0
+    return f"{bytes_size:.1f} TB"
+
+
+def build_dict_of_dicts(count: int):
+    """Build storage the way main.py used to: uuid string -> metadata dict"""
+    files = {}
+    for i in range(count):
+        now = datetime.now(timezone.utc)
+        files[str(uuid.uuid4())] = {
+            "owner_ip": OWNERS[i % len(OWNERS)],
+            "filename": f"snippet_{i}.txt",
+            "content": PAYLOAD,
+            "content_type": "text/plain",
+            "size": len(PAYLOAD),
+            "uploaded_at": now,
+            "expires_at": now + timedelta(hours=1),
+            "file_password": None,
+        }
+    return files
+
+
+def build_share_store(count: int):
+    """Build storage with slotted records and 16-byte keys"""
+    store = ShareStore()
+    for i in range(count):
+        now = int(time.time())
+        store.add(Share(
+            owner_ip=OWNERS[i % len(OWNERS)],
+            filename=f"snippet_{i}.txt",
+            content=PAYLOAD,
+            content_type="text/plain",
+            uploaded_at=now,
+            expires_at=now + 3600,
+        ))
+    return store
+
+
+def measure(name: str, builder, count: int, lookup):
+    """Measure memory held by a storage layout and its lookup speed"""
+    print(f"\n📦 {name}")
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    storage = builder(count)
+    build_time = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Lookups use URL token strings, as requests to /download do
+    sample = random.sample(list(storage), min(LOOKUPS, count))
+    start = time.perf_counter()
+    for token in sample:
+        lookup(storage, token)
+    lookup_time = time.perf_counter() - start
+
+    print(f"   Build:   {build_time:.2f} s")
+    print(f"   Memory:  {format_size(memory)} ({memory / count:.0f} B/entry)")
+    print(f"   Lookup:  {lookup_time / len(sample) * 1e9:.0f} ns/lookup")
+    return memory, lookup_time / len(sample)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"🧪 Share storage benchmark ({count:,} entries)")
+    print("=" * 60)
+
+    old_mem, old_lookup = measure(
+        "dict-of-dicts (str uuid keys, datetime timestamps)",
+        build_dict_of_dicts, count,
+        lambda files, token: files[token]["size"],
+    )
+    new_mem, new_lookup = measure(
+        "ShareStore (16-byte keys, slotted records, indexes)",
+        build_share_store, count,
+        lambda store, token: store[token].size,
+    )
+
+    print(f"\n{'='*60}")
+    print(f"💾 Memory: {new_mem / old_mem:.2f}x of dict-of-dicts")
+    print(f"⏱️  Lookup: {new_lookup / old_lookup:.2f}x of dict-of-dicts "
+          f"(includes str -> bytes token parsing)")
+
+
+if __name__ == "__main__":
+    main()
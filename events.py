@@ -0,0 +1,67 @@
+"""
+In-process pub/sub for share events, delivered as Server-Sent Events.
+
+Publishers format each event once into its SSE wire form and hand the same
+bytes to every subscriber's queue. Publishing to a token nobody is watching
+costs a single dict lookup, so callers on hot paths can check
+``has_subscribers`` and skip event work entirely.
+"""
+
+import asyncio
+import json
+from typing import Dict, Optional, Set
+
+SUBSCRIBER_QUEUE_SIZE = 64
+TERMINAL_EVENTS = ("expired", "deleted")
+
+
+def format_event(event: str, data: dict) -> bytes:
+    """Encode an event in text/event-stream format"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class EventBus:
+    """Per-token fan-out of pre-encoded events to subscriber queues"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def has_subscribers(self, token: str) -> bool:
+        return token in self._subscribers
+
+    def subscribe(self, token: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(token, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, token: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(token)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[token]
+
+    def publish(self, token: str, event: str, data: dict) -> None:
+        """Send an event to everyone watching a token (must run on the event loop)"""
+        queues = self._subscribers.get(token)
+        if not queues:
+            return
+
+        message = (event, format_event(event, data))
+        for queue in queues:
+            if queue.full():
+                # A slow subscriber loses its oldest event rather than blocking publishers
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+
+async def next_event(queue: asyncio.Queue, timeout: float) -> Optional[tuple]:
+    """Wait for the next (event, message) pair, or None on timeout"""
+    try:
+        return await asyncio.wait_for(queue.get(), timeout)
+    except asyncio.TimeoutError:
+        return None
@@ -1,20 +1,28 @@
 import asyncio
+import base64
+import hashlib
 import os
+import re
+import secrets
 import socket
-import uuid
+import time
 from contextlib import asynccontextmanager
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from io import BytesIO
-from typing import Dict, Any, Optional
+from typing import Optional
 
-import qrcode
 from fastapi import FastAPI, File, UploadFile, Request, HTTPException, Form
-from fastapi.responses import HTMLResponse, StreamingResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+
+from admission import UploadAdmission, UploadAdmissionMiddleware
+from arena import ArenaBlock, PayloadArena
+from events import TERMINAL_EVENTS, EventBus, format_event, next_event
+from previews import MappedPayload, PreviewCache, PreviewError
+from share_store import Share, ShareStore
+from static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticAssets
 
 # In-memory storage for files
-files: Dict[str, Dict[str, Any]] = {}
+files = ShareStore()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -23,14 +31,11 @@ async def lifespan(app: FastAPI):
     async def cleaner():
         while True:
             try:
-                now = datetime.now(timezone.utc)
-                expired_tokens = [
-                    token for token, file_data in files.items()
-                    if file_data["expires_at"] < now
-                ]
-                for token in expired_tokens:
-                    del files[token]
+                for token, _ in files.pop_expired():
                     print(f"Cleaned up expired file: {token}")
+                if payload_arena is not None:
+                    # Unmap reader mappings of finished downloads
+                    payload_arena.reclaim()
             except Exception as e:
                 print(f"Error in cleanup task: {e}")
 
@@ -38,9 +43,14 @@ async def lifespan(app: FastAPI):
 
     cleanup_task = asyncio.create_task(cleaner())
 
+    # Compile templates and import QR code support off the event loop, so the
+    # server accepts requests before paying for them
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+
     yield  # Application runs here
 
-    # Shutdown: Cancel cleanup task
+    # Shutdown: Cancel cleanup task and stop preview workers
+    preview_cache.shutdown()
     cleanup_task.cancel()
     try:
         await cleanup_task
@@ -56,10 +66,92 @@ app = FastAPI(
 # Configuration
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 100 * 1024 * 1024))  # 100MB default
 MAX_TOTAL_MEMORY = int(os.getenv("MAX_TOTAL_MEMORY", 500 * 1024 * 1024))  # 500MB default
+MAX_OWNER_MEMORY = int(os.getenv("MAX_OWNER_MEMORY", 250 * 1024 * 1024))  # 250MB per uploader default
+MAX_OWNER_FILES = int(os.getenv("MAX_OWNER_FILES", 100))  # Active files per uploader
+SHARE_LIFETIME_SECONDS = 60 * 60  # Files expire after 1 hour
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Read and hash uploads 1MB at a time
+ENABLE_BLAKE2 = os.getenv("ENABLE_BLAKE2", "false").lower() == "true"  # Also compute BLAKE2b-512
+ENABLE_PREVIEWS = os.getenv("ENABLE_PREVIEWS", "true").lower() == "true"  # Image thumbnails at /preview
+PREVIEW_SIZE = int(os.getenv("PREVIEW_SIZE", 320))  # Longest thumbnail edge in pixels
+PREVIEW_MAX_PIXELS = int(os.getenv("PREVIEW_MAX_PIXELS", 40_000_000))  # Larger images get no preview
+PREVIEW_CACHE_SIZE = int(os.getenv("PREVIEW_CACHE_SIZE", 32 * 1024 * 1024))  # 32MB of thumbnails
+PREVIEW_WORKERS = int(os.getenv("PREVIEW_WORKERS", 2))  # Processes rendering thumbnails
+
+MAX_CONCURRENT_UPLOADS = int(os.getenv("MAX_CONCURRENT_UPLOADS", 4))  # Uploads read at once
+MAX_UPLOAD_INFLIGHT_BYTES = int(os.getenv("MAX_UPLOAD_INFLIGHT_BYTES", 2 * MAX_FILE_SIZE))  # Bytes being uploaded at once
+MAX_UPLOAD_QUEUE = int(os.getenv("MAX_UPLOAD_QUEUE", 32))  # Uploads waiting for a slot
+UPLOAD_QUEUE_TIMEOUT = float(os.getenv("UPLOAD_QUEUE_TIMEOUT", 30))  # Seconds an upload may wait
+UPLOAD_RETRY_AFTER = int(os.getenv("UPLOAD_RETRY_AFTER", 5))  # Retry-After seconds when busy
+MULTIPART_OVERHEAD = 64 * 1024  # Allowance for form fields and multipart boundaries
+
+upload_admission = UploadAdmission(
+    MAX_CONCURRENT_UPLOADS, MAX_UPLOAD_INFLIGHT_BYTES, MAX_UPLOAD_QUEUE,
+    UPLOAD_QUEUE_TIMEOUT, UPLOAD_RETRY_AFTER
+)
+# Admit uploads before their body is parsed, so bursts can't exhaust memory
+app.add_middleware(
+    UploadAdmissionMiddleware,
+    controller=upload_admission,
+    max_request_bytes=MAX_FILE_SIZE + MULTIPART_OVERHEAD
+)
+
+preview_cache = PreviewCache(PREVIEW_CACHE_SIZE, PREVIEW_SIZE, PREVIEW_MAX_PIXELS, PREVIEW_WORKERS)
+# Thumbnails go away together with their share
+files.add_removal_listener(lambda token, share: preview_cache.discard(token))
+
+PAYLOAD_ARENA = os.getenv("PAYLOAD_ARENA", "false").lower() == "true"  # Store payloads in mmap regions
+ARENA_SLAB_SIZE = int(os.getenv("ARENA_SLAB_SIZE", 4 * 1024 * 1024))  # Region size for small payloads
+ARENA_LARGE_THRESHOLD = int(os.getenv("ARENA_LARGE_THRESHOLD", 1024 * 1024))  # Bigger payloads get their own region
+ARENA_BACKING_DIR = os.getenv("ARENA_BACKING_DIR")  # Back regions with files here instead of anonymous memory
+
+payload_arena = (
+    PayloadArena(ARENA_SLAB_SIZE, ARENA_LARGE_THRESHOLD, ARENA_BACKING_DIR) if PAYLOAD_ARENA else None
+)
+
+def free_payload(token: str, share: Share) -> None:
+    """Hand a removed share's arena block back to the arena"""
+    if isinstance(share.content, ArenaBlock):
+        payload_arena.free(share.content)
+
+files.add_removal_listener(free_payload)
 
-# Mount static files and templates
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # Chunk size for streamed downloads
+PROGRESS_INTERVAL = 0.25  # Minimum seconds between download_progress events
+SSE_KEEPALIVE_SECONDS = 15  # Comment line sent on idle event streams
+
+event_bus = EventBus()
+
+def publish_removal(token: str, share: Share) -> None:
+    """Tell watchers that a share expired or was deleted"""
+    event = "expired" if share.is_expired() else "deleted"
+    event_bus.publish(token, event, {"filename": share.filename})
+
+files.add_removal_listener(publish_removal)
+
+# Static files are precompressed in memory; templates are loaded on first use
+static_assets = StaticAssets("static")
+_templates = None
+
+def get_templates():
+    """Create the Jinja2 template loader on first use"""
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        templates = Jinja2Templates(directory="templates")
+        templates.env.globals["static_url"] = static_assets.url
+        _templates = templates
+    return _templates
+
+def warm_up() -> None:
+    """Load heavy dependencies and compile templates ahead of first use"""
+    try:
+        static_assets.build()
+        templates = get_templates()
+        for name in ("index.html", "success.html"):
+            templates.get_template(name)
+        import qrcode  # noqa: F401 - pulls in PIL
+    except Exception as e:
+        print(f"Error warming up: {e}")
 
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format"""
@@ -72,13 +164,18 @@ def format_file_size(size_bytes: int) -> str:
         i += 1
     return f"{size_bytes:.1f} {size_names[i]}"
 
+def format_timestamp(epoch_seconds: int) -> str:
+    """Format an epoch timestamp as a UTC date string"""
+    return datetime.fromtimestamp(epoch_seconds, timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+
 def get_total_memory_usage() -> int:
     """Calculate total memory usage of stored files"""
-    return sum(file_data["size"] for file_data in files.values())
+    return files.total_bytes
 
-def check_memory_limits(new_file_size: int) -> None:
-    """Check if adding a new file would exceed memory limits"""
+def check_memory_limits(new_file_size: int, owner_ip: str) -> None:
+    """Check if adding a new file would exceed memory or per-owner limits"""
     current_memory = get_total_memory_usage()
+    owner_files, owner_memory = files.owner_usage(owner_ip)
 
     if new_file_size > MAX_FILE_SIZE:
         raise HTTPException(
@@ -93,6 +190,59 @@ def check_memory_limits(new_file_size: int) -> None:
                    f"Current usage: {format_file_size(current_memory)}"
         )
 
+    if owner_files >= MAX_OWNER_FILES:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many active files. Each device may share up to {MAX_OWNER_FILES} files at once. "
+                   f"Delete some shares or wait for them to expire"
+        )
+
+    if owner_memory + new_file_size > MAX_OWNER_MEMORY:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Per-device storage quota exceeded. Quota is {format_file_size(MAX_OWNER_MEMORY)}. "
+                   f"Your current usage: {format_file_size(owner_memory)}"
+        )
+
+OWNER_KEY_COOKIE = "share_owner"  # Cookie holding the browser's owner key
+OWNER_KEY_HEADER = "x-owner-key"  # Header alternative for API clients
+OWNER_KEY_MAX_AGE = 30 * 24 * 60 * 60  # Keep the cookie for 30 days
+OWNER_KEY_PATTERN = re.compile(r"[A-Za-z0-9_-]{22,128}")
+
+def get_owner_key(request: Request) -> Optional[str]:
+    """The caller's owner key from the X-Owner-Key header or cookie (None if absent or malformed)"""
+    key = request.headers.get(OWNER_KEY_HEADER) or request.cookies.get(OWNER_KEY_COOKIE)
+    if key is None or not OWNER_KEY_PATTERN.fullmatch(key):
+        return None
+    return key
+
+def is_share_owner(share: Share, owner_key: Optional[str]) -> bool:
+    """Check that the caller holds the secret the share was uploaded with"""
+    return (owner_key is not None and share.owner_key is not None
+            and secrets.compare_digest(share.owner_key, owner_key))
+
+def has_preview(share: Share) -> bool:
+    """Check whether a preview thumbnail can be offered for a share"""
+    return ENABLE_PREVIEWS and share.content_type.startswith("image/")
+
+def digest_fields(share: Share) -> dict:
+    """Digests of a share's content as hex strings, keyed by algorithm"""
+    digests = {"sha-256": share.sha256.hex()}
+    if share.blake2b is not None:
+        digests["blake2b-512"] = share.blake2b.hex()
+    return digests
+
+def digest_headers(share: Share) -> dict:
+    """Build Repr-Digest (RFC 9530) and legacy Digest (RFC 3230) headers"""
+    sha256 = base64.b64encode(share.sha256).decode()
+    repr_digest = f"sha-256=:{sha256}:"
+    if share.blake2b is not None:
+        repr_digest += f", blake2b-512=:{base64.b64encode(share.blake2b).decode()}:"
+    return {
+        "Repr-Digest": repr_digest,
+        "Digest": f"SHA-256={sha256}"
+    }
+
 def get_local_ip():
     """Get the local IP address of this machine"""
     try:
@@ -118,6 +268,8 @@ def get_server_url(request: Request) -> str:
 
 def generate_qr_code(url: str) -> str:
     """Generate QR code for the given URL and return as base64 string"""
+    import qrcode  # Imported lazily: qrcode and PIL are slow to load
+
     qr = qrcode.QRCode(version=1, box_size=10, border=5)
     qr.add_data(url)
     qr.make(fit=True)
@@ -127,17 +279,41 @@ def generate_qr_code(url: str) -> str:
     img.save(buffer, format="PNG")
     buffer.seek(0)
     
-    import base64
     img_str = base64.b64encode(buffer.getvalue()).decode()
     return f"data:image/png;base64,{img_str}"
 
 
 
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static_file(request: Request, path: str):
+    """Serve a static asset, precompressed to match Accept-Encoding"""
+    entry = static_assets.lookup(path)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    asset, fingerprinted = entry
+
+    body, encoding = asset.select(request.headers.get("accept-encoding", ""))
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL,
+        "ETag": asset.etag(encoding),
+        "Vary": "Accept-Encoding"
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    headers["Content-Length"] = str(len(body))
+
+    if request.method == "HEAD":
+        return Response(media_type=asset.media_type, headers=headers)
+    return Response(content=body, media_type=asset.media_type, headers=headers)
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Home page with file upload form"""
     server_url = get_server_url(request)
-    return templates.TemplateResponse("index.html", {
+    return get_templates().TemplateResponse("index.html", {
         "request": request,
         "server_url": server_url,
         "password_protected": False  # No page-level protection, only per-file
@@ -156,77 +332,367 @@ async def upload_file(
     # Debug: Log the received password
     print(f"DEBUG: Received file_password: '{file_password}' (type: {type(file_password)})")
 
-    # Read file content first to check size
-    content = await file.read()
-    file_size = len(content)
-
-    # Check file size and memory limits
-    check_memory_limits(file_size)
+    block = None
+    buffer = None
+    if file.size is not None:
+        # The spooled upload's size is known, so check limits up front and
+        # write chunks straight into place instead of joining them afterwards
+        check_memory_limits(file.size, request.client.host)
+        if payload_arena is not None:
+            block = payload_arena.allocate(file.size)
+        else:
+            buffer = bytearray(file.size)
+
+    # Read file content in chunks, hashing each chunk as it arrives so the
+    # digests cost no extra pass over the data
+    sha256 = hashlib.sha256()
+    blake2b = hashlib.blake2b() if ENABLE_BLAKE2 else None
+    chunks = []  # Only used when the upload size is unknown
+    file_size = 0
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if file_size > MAX_FILE_SIZE:
+                break
+            if file.size is not None and file_size > file.size:
+                raise HTTPException(status_code=400, detail="Upload size changed while reading")
+            sha256.update(chunk)
+            if blake2b is not None:
+                blake2b.update(chunk)
+            if block is not None:
+                block.write(file_size - len(chunk), chunk)
+            elif buffer is not None:
+                buffer[file_size - len(chunk):file_size] = chunk
+            else:
+                chunks.append(chunk)
+
+        # Check file size, memory and per-owner limits again right before
+        # storing, since other uploads may have been stored while this one was read
+        check_memory_limits(file_size, request.client.host)
+        if file.size is not None and file_size != file.size:
+            raise HTTPException(status_code=400, detail="Upload size changed while reading")
+    except BaseException:
+        if block is not None:
+            payload_arena.free(block)
+        raise
+
+    # Store file in memory with metadata under a unique token
+    if block is not None:
+        content = block
+    elif buffer is not None:
+        content = buffer
+    elif payload_arena is not None:
+        content = payload_arena.allocate(file_size)
+        position = 0
+        for chunk in chunks:
+            content.write(position, chunk)
+            position += len(chunk)
+    else:
+        content = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+    del chunks
+    # Reuse the caller's owner key so all their uploads can be listed together
+    owner_key = get_owner_key(request) or secrets.token_urlsafe(24)
+    now = int(time.time())
+    share = Share(
+        owner_ip=request.client.host,
+        filename=file.filename,
+        content=content,
+        content_type=file.content_type or "application/octet-stream",
+        uploaded_at=now,
+        expires_at=now + SHARE_LIFETIME_SECONDS,
+        file_password=file_password,  # Optional password for this specific file
+        sha256=sha256.digest(),
+        blake2b=blake2b.digest() if blake2b is not None else None,
+        owner_key=owner_key
+    )
+    token = files.add(share)
 
-    # Generate unique token
-    token = str(uuid.uuid4())
+    server_url = get_server_url(request)
 
-    # Store file in memory with metadata
-    files[token] = {
-        "owner_ip": request.client.host,
-        "filename": file.filename,
-        "content": content,
-        "content_type": file.content_type or "application/octet-stream",
-        "size": file_size,
-        "uploaded_at": datetime.now(timezone.utc),
-        "expires_at": datetime.now(timezone.utc) + timedelta(hours=1),  # Expire in 1 hour
-        "file_password": file_password  # Optional password for this specific file
-    }
+    # API clients (e.g. share_cli.py) get JSON instead of the success page
+    if "application/json" in request.headers.get("accept", ""):
+        response = JSONResponse({**share_summary(token, share, server_url), "owner_key": owner_key})
+        set_owner_cookie(request, response, owner_key)
+        return response
 
     # Generate download URL and QR code
-    server_url = get_server_url(request)
     download_url = f"{server_url}/download/{token}"
     qr_code = generate_qr_code(download_url)
 
-    return templates.TemplateResponse("success.html", {
+    response = get_templates().TemplateResponse("success.html", {
         "request": request,
         "filename": file.filename,
         "download_url": download_url,
         "qr_code": qr_code,
         "file_size": file_size,
-        "expires_at": files[token]["expires_at"].strftime("%Y-%m-%d %H:%M:%S UTC"),
+        "expires_at": format_timestamp(share.expires_at),
         "has_file_password": bool(file_password),
-        "server_url": server_url
+        "server_url": server_url,
+        "digests": digest_fields(share),
+        "events_url": f"/events/{token}",
+        # Password-protected previews would need the password in the page, so skip them
+        "preview_url": f"/preview/{token}" if has_preview(share) and not file_password else None
     })
+    set_owner_cookie(request, response, owner_key)
+    return response
+
+def set_owner_cookie(request: Request, response: Response, owner_key: str) -> None:
+    """Remember the owner key in the browser so later uploads share it"""
+    response.set_cookie(
+        OWNER_KEY_COOKIE, owner_key,
+        max_age=OWNER_KEY_MAX_AGE,
+        httponly=True,
+        samesite="lax",
+        secure=request.url.scheme == "https" or request.headers.get("x-forwarded-proto") == "https"
+    )
 
-@app.get("/download/{token}")
-async def download_file(token: str, password: Optional[str] = None):
-    """Download a file by token"""
-    if token not in files:
+def get_accessible_share(token: str, password: Optional[str]) -> Share:
+    """Look up a share, checking expiry and its file password"""
+    file_data = files.get(token)
+    if file_data is None:
         raise HTTPException(status_code=404, detail="File not found or expired")
 
-    file_data = files[token]
-
     # Check if file has expired
-    if file_data["expires_at"] < datetime.now(timezone.utc):
-        del files[token]
+    if file_data.is_expired():
+        files.remove(token)
         raise HTTPException(status_code=404, detail="File has expired")
 
     # Check file-specific password if set
-    if file_data.get("file_password") and password != file_data["file_password"]:
+    if file_data.file_password and password != file_data.file_password:
         raise HTTPException(
             status_code=401,
             detail="File password required. Add ?password=YOUR_PASSWORD to the URL"
         )
 
+    return file_data
+
+class MemoryviewStreamingResponse(StreamingResponse):
+    """StreamingResponse that sends memoryview chunks without copying them to bytes"""
+
+    async def stream_response(self, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        async for chunk in self.body_iterator:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+@app.api_route("/download/{token}", methods=["GET", "HEAD"])
+async def download_file(request: Request, token: str, password: Optional[str] = None):
+    """Download a file by token (HEAD returns headers and digests only)"""
+    file_data = get_accessible_share(token, password)
+
+    headers = {
+        "Content-Disposition": f"attachment; filename={file_data.filename}",
+        "Content-Length": str(file_data.size),
+        **digest_headers(file_data)
+    }
+
+    if request.method == "HEAD":
+        return Response(media_type=file_data.content_type, headers=headers)
+
+    content = file_data.content
+    watched = event_bus.has_subscribers(token)
+
     # Create streaming response
     def generate():
-        yield file_data["content"]
+        yield content
+
+    # The body is streamed after this handler returns, when the share may
+    # already be gone; map an arena payload now so a freed slot can't be
+    # reused for another upload before it is read
+    view = content.open_view() if isinstance(content, ArenaBlock) else None
+
+    async def generate_chunks(view):
+        # Used for arena payloads and while the owner is watching; plain
+        # in-memory downloads nobody watches take the single-chunk path above
+        if view is None:
+            view = memoryview(content)
+        total = len(view)
+        if watched:
+            event_bus.publish(token, "download_started", {"size": total})
+        sent = 0
+        last_progress = time.monotonic()
+        try:
+            for start in range(0, total, DOWNLOAD_CHUNK_SIZE):
+                chunk = view[start:start + DOWNLOAD_CHUNK_SIZE]
+                yield chunk
+                sent += len(chunk)
+                if watched and sent < total:
+                    now = time.monotonic()
+                    if now - last_progress >= PROGRESS_INTERVAL:
+                        event_bus.publish(token, "download_progress", {"sent": sent, "size": total})
+                        last_progress = now
+            if watched:
+                event_bus.publish(token, "download_finished", {"size": total})
+        finally:
+            chunk = None
+            view.release()
+            if isinstance(content, ArenaBlock):
+                # Mappings still referenced by the transport are unmapped later
+                content.close_readers()
+
+    if not isinstance(content, ArenaBlock) and not watched:
+        return MemoryviewStreamingResponse(generate(), media_type=file_data.content_type, headers=headers)
+
+    return MemoryviewStreamingResponse(
+        generate_chunks(view),
+        media_type=file_data.content_type,
+        headers=headers
+    )
+
+@app.get("/preview/{token}")
+async def preview_file(token: str, password: Optional[str] = None):
+    """Downscaled thumbnail of an image share"""
+    file_data = get_accessible_share(token, password)
+
+    if not has_preview(file_data):
+        raise HTTPException(status_code=415, detail="Preview not available for this file type")
+
+    content, release = file_data.content, None
+    if isinstance(content, ArenaBlock):
+        # Workers map the payload themselves instead of getting a pickled copy
+        shared = content.open_shared()
+        if shared is not None:
+            content, release = MappedPayload(shared.path, shared.offset, shared.length), shared.close
+        elif content.length <= ARENA_LARGE_THRESHOLD:
+            content = content.tobytes()
+        else:
+            raise HTTPException(status_code=415, detail="Preview not available for files this large")
+
+    try:
+        thumbnail, media_type = await preview_cache.get(token, content, release)
+    except PreviewError:
+        raise HTTPException(status_code=415, detail="Preview not available: image could not be decoded")
+
+    return Response(
+        content=thumbnail,
+        media_type=media_type,
+        headers={"Cache-Control": "private, max-age=300"}
+    )
+
+def share_status(share: Share) -> dict:
+    """Current state of a share for the event stream"""
+    return {
+        "filename": share.filename,
+        "size": share.size,
+        "expires_at": format_timestamp(share.expires_at),
+        "expires_in": max(0, share.expires_at - int(time.time()))
+    }
+
+@app.get("/events/{token}")
+async def share_events(request: Request, token: str):
+    """Server-Sent Events stream of downloads and expiry for the share's owner"""
+    share = files.get(token)
+    if share is None:
+        raise HTTPException(status_code=404, detail="File not found or expired")
+
+    if share.owner_ip != request.client.host:
+        raise HTTPException(status_code=403, detail="Only the uploader can watch this file")
+
+    queue = event_bus.subscribe(token)
+
+    async def stream():
+        try:
+            yield format_event("status", share_status(share))
+            while True:
+                if files.get(token) is not share:
+                    yield format_event("deleted", {"filename": share.filename})
+                    return
+                seconds_left = share.expires_at - time.time()
+                if seconds_left <= 0:
+                    # Don't wait for the cleanup task to notice
+                    yield format_event("expired", {"filename": share.filename})
+                    return
+
+                item = await next_event(queue, min(SSE_KEEPALIVE_SECONDS, seconds_left))
+                if item is None:
+                    yield b": keepalive\n\n"
+                    continue
+                event, message = item
+                yield message
+                if event in TERMINAL_EVENTS:
+                    return
+        finally:
+            event_bus.unsubscribe(token, queue)
 
     return StreamingResponse(
-        generate(),
-        media_type=file_data["content_type"],
-        headers={
-            "Content-Disposition": f"attachment; filename={file_data['filename']}",
-            "Content-Length": str(file_data["size"])
-        }
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
+def share_summary(token: str, share: Share, server_url: str) -> dict:
+    """Describe a share for the owner listing API"""
+    return {
+        "token": token,
+        "filename": share.filename,
+        "size": share.size,
+        "size_formatted": format_file_size(share.size),
+        "content_type": share.content_type,
+        "uploaded_at": format_timestamp(share.uploaded_at),
+        "expires_at": format_timestamp(share.expires_at),
+        "has_file_password": bool(share.file_password),
+        "digests": digest_fields(share),
+        "download_url": f"{server_url}/download/{token}"
+    }
+
+@app.get("/shares")
+async def list_shares(request: Request):
+    """List the caller's active shares and the quota usage of their address
+
+    Only shares uploaded with the caller's owner key are listed, since
+    everyone behind the same NAT shares an address (and its quota).
+    """
+    owner_ip = request.client.host
+    owner_key = get_owner_key(request)
+    server_url = get_server_url(request)
+    owner_files, owner_memory = files.owner_usage(owner_ip)
+
+    owned = []
+    for token in files.tokens_for_owner(owner_ip):
+        share = files.get(token)
+        if share is not None and not share.is_expired() and is_share_owner(share, owner_key):
+            owned.append((share.uploaded_at, token, share))
+    owned.sort(key=lambda item: item[0])
+    shares = [share_summary(token, share, server_url) for _, token, share in owned]
+
+    return {
+        "owner_ip": owner_ip,
+        "shares": shares,
+        "quota": {
+            "files": owner_files,
+            "max_files": MAX_OWNER_FILES,
+            "bytes": owner_memory,
+            "bytes_formatted": format_file_size(owner_memory),
+            "max_bytes": MAX_OWNER_MEMORY,
+            "max_bytes_formatted": format_file_size(MAX_OWNER_MEMORY)
+        }
+    }
+
+@app.delete("/shares/{token}")
+async def delete_share(request: Request, token: str):
+    """Revoke one of the caller's shares before it expires"""
+    share = files.get(token)
+    if share is None:
+        raise HTTPException(status_code=404, detail="File not found or expired")
+
+    if not is_share_owner(share, get_owner_key(request)):
+        raise HTTPException(status_code=403, detail="Only the uploader can delete this file")
+
+    files.remove(token)
+    return {"deleted": [token]}
+
+@app.delete("/shares")
+async def delete_all_shares(request: Request):
+    """Revoke every share uploaded with the caller's owner key"""
+    owner_key = get_owner_key(request)
+    tokens = [
+        token for token in files.tokens_for_owner(request.client.host)
+        if is_share_owner(files.get(token), owner_key)
+    ]
+    for token in tokens:
+        files.remove(token)
+    return {"deleted": tokens}
+
 @app.get("/status")
 async def get_status(request: Request):
     """Get server status and active files count"""
@@ -247,8 +713,16 @@ async def get_status(request: Request):
         },
         "file_limits": {
             "max_file_size_bytes": MAX_FILE_SIZE,
-            "max_file_size_formatted": format_file_size(MAX_FILE_SIZE)
+            "max_file_size_formatted": format_file_size(MAX_FILE_SIZE),
+            "max_owner_memory_bytes": MAX_OWNER_MEMORY,
+            "max_owner_memory_formatted": format_file_size(MAX_OWNER_MEMORY),
+            "max_owner_files": MAX_OWNER_FILES
         },
+        "upload_admission": upload_admission.stats(),
+        "event_subscribers": event_bus.subscriber_count(),
+        "payload_arena": payload_arena.stats() if payload_arena is not None else None,
+        "previews": preview_cache.stats() if ENABLE_PREVIEWS else None,
+        "digest_algorithms": ["sha-256", "blake2b-512"] if ENABLE_BLAKE2 else ["sha-256"],
         "server_time": datetime.now(timezone.utc).isoformat(),
         "password_protected": False  # No page-level protection
     }
@@ -263,6 +737,7 @@ if __name__ == "__main__":
     print(f"Local Network: http://{local_ip}:{port}")
     print("Security: Per-file password protection available")
     print(f"File Limits: Max {format_file_size(MAX_FILE_SIZE)} per file, {format_file_size(MAX_TOTAL_MEMORY)} total")
+    print(f"Per-Device Quota: {MAX_OWNER_FILES} files, {format_file_size(MAX_OWNER_MEMORY)}")
     print("=" * 50)
     print("For internet access:")
     print("1. Configure your router/firewall to forward port", port)
@@ -0,0 +1,205 @@
+"""
+Thumbnail previews for shared images.
+
+Thumbnails are rendered in a process pool so decoding and resizing never block
+the event loop or hold the GIL against downloads. Rendered thumbnails are kept
+in a size-bounded LRU cache keyed by share token, and concurrent requests for
+the same preview share a single render. Payloads kept in the arena are
+passed to workers as a ``MappedPayload`` and mapped there, rather than being
+copied and pickled.
+"""
+
+import asyncio
+import mmap
+import multiprocessing
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+Thumbnail = Tuple[bytes, str]  # (image bytes, media type)
+
+
+class MappedPayload(NamedTuple):
+    """Where a worker can map a payload instead of receiving a copy"""
+    path: str
+    offset: int
+    length: int
+
+
+Payload = Union[bytes, MappedPayload]
+
+
+class PreviewError(Exception):
+    """Raised when a file can't be rendered as a preview"""
+
+
+def open_payload(content: Payload):
+    """File object over a payload's bytes"""
+    if not isinstance(content, MappedPayload):
+        return BytesIO(content)
+    if content.length == 0:
+        return BytesIO(b"")  # A zero length would map the whole region
+    aligned = content.offset - content.offset % mmap.ALLOCATIONGRANULARITY
+    with open(content.path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), content.offset - aligned + content.length,
+                            offset=aligned, access=mmap.ACCESS_READ)
+    if aligned == content.offset:
+        return mapping  # mmap objects are file-like
+    # Only small slab slots start mid-page; copying those out is cheap
+    with mapping:
+        return BytesIO(mapping[content.offset - aligned:])
+
+
+def render_thumbnail(content: Payload, max_size: int, max_pixels: int) -> Thumbnail:
+    """Decode an image and downscale it to fit within max_size pixels
+
+    Runs inside a worker process, so it only takes and returns picklable values.
+    Images declaring more than max_pixels pixels are refused before decoding.
+    """
+    from PIL import Image  # Imported lazily: only worker processes need PIL
+
+    try:
+        with warnings.catch_warnings(), open_payload(content) as fp:
+            # PIL only warns about likely decompression bombs; refuse them instead
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(fp) as img:
+                # open() only reads the header, so the declared size is checked
+                # before a tiny file can expand into gigabytes of pixels
+                width, height = img.size
+                if width * height > max_pixels:
+                    raise PreviewError(f"Image is too large to preview ({width}x{height})")
+
+                # Let JPEG decode at reduced resolution instead of full size
+                img.draft("RGB", (max_size, max_size))
+                img.thumbnail((max_size, max_size))
+
+                buffer = BytesIO()
+                if img.mode in ("RGBA", "LA", "P"):
+                    img.save(buffer, format="PNG", optimize=True)
+                    return buffer.getvalue(), "image/png"
+                img.convert("RGB").save(buffer, format="JPEG", quality=80)
+                return buffer.getvalue(), "image/jpeg"
+    except PreviewError:
+        raise
+    except Exception as e:
+        # PIL raises many exception types; workers report them uniformly
+        raise PreviewError(str(e)) from None
+
+
+class PreviewCache:
+    """LRU cache of rendered thumbnails bounded by total size"""
+
+    def __init__(self, max_bytes: int, max_size: int, max_pixels: int, workers: int):
+        self.max_bytes = max_bytes
+        self.max_size = max_size
+        self.max_pixels = max_pixels
+        self.workers = workers
+        self._cache: "OrderedDict[str, Thumbnail]" = OrderedDict()
+        self._cache_bytes = 0
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Worker processes are started on the first preview, not at startup.
+        # Forking the live server would copy its heap and stored payloads into
+        # every worker (and could deadlock on locks held by other threads), so
+        # workers start from a clean forkserver or spawned interpreter instead
+        if self._executor is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(method)
+            )
+        return self._executor
+
+    def _reset_executor(self, executor: ProcessPoolExecutor) -> None:
+        # A worker died (e.g. killed for running out of memory) and the pool
+        # can't be used again; the next render starts a fresh one
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _render(self, content: Payload) -> Thumbnail:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            future = loop.run_in_executor(executor, render_thumbnail, content, self.max_size, self.max_pixels)
+        except BrokenProcessPool:
+            # The pool broke while idle, so nothing was rendered yet: retry once
+            self._reset_executor(executor)
+            executor = self._get_executor()
+            future = loop.run_in_executor(executor, render_thumbnail, content, self.max_size, self.max_pixels)
+        try:
+            return await future
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            raise PreviewError("Preview worker stopped while rendering") from None
+
+    async def get(self, token: str, content: Payload,
+                  release: Optional[Callable[[], None]] = None) -> Thumbnail:
+        """Return the thumbnail for a share, rendering it if needed
+
+        release is called once content is no longer needed: when the render
+        finishes (even if this request was cancelled first), or right away
+        if no render was started.
+        """
+        cached = self._cache.get(token)
+        pending = self._pending.get(token)
+        if cached is not None or pending is not None:
+            if release is not None:
+                release()
+            if cached is not None:
+                self._cache.move_to_end(token)
+                return cached
+            # Coalesce concurrent requests for the same preview into one render
+            return await asyncio.shield(pending)
+
+        future = asyncio.ensure_future(self._render(content))
+        if release is not None:
+            future.add_done_callback(lambda _: release())
+        self._pending[token] = future
+        try:
+            thumbnail = await asyncio.shield(future)
+        finally:
+            # discard() removes the pending entry if the share went away mid-render
+            discarded = self._pending.get(token) is not future
+            if not discarded:
+                del self._pending[token]
+
+        if not discarded:
+            self._store(token, thumbnail)
+        return thumbnail
+
+    def _store(self, token: str, thumbnail: Thumbnail) -> None:
+        size = len(thumbnail[0])
+        if size > self.max_bytes:
+            return
+        self._cache[token] = thumbnail
+        self._cache_bytes += size
+        while self._cache_bytes > self.max_bytes:
+            _, (evicted, _) = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    def discard(self, token: str) -> None:
+        """Drop a share's thumbnail, e.g. when the share is removed"""
+        # A render still in flight must not repopulate the cache afterwards
+        self._pending.pop(token, None)
+        cached = self._cache.pop(token, None)
+        if cached is not None:
+            self._cache_bytes -= len(cached[0])
+
+    def stats(self) -> dict:
+        return {
+            "cached_previews": len(self._cache),
+            "cache_bytes": self._cache_bytes,
+            "max_cache_bytes": self.max_bytes,
+            "rendering": len(self._pending)
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
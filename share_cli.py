@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Command-line client for batch uploads and downloads
+
+Files are streamed from and to disk, transfers run in parallel over a pool
+of keep-alive connections, and results (tokens, URLs, digests) are printed
+as JSON on stdout. Progress and throughput go to stderr.
+
+Examples:
+    python share_cli.py upload ./photos "logs/*.txt" --password secret
+    python share_cli.py download TOKEN1 http://host:8000/download/TOKEN2 -o ./downloads
+"""
+
+import argparse
+import base64
+import glob
+import hashlib
+import http.client
+import json
+import mimetypes
+import os
+import queue
+import secrets
+import select
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from urllib.parse import quote, urlsplit
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_SERVER = "http://localhost:8000"
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+
+
+class TransferError(Exception):
+    """Raised when the server rejects a transfer"""
+
+
+def format_size(bytes_size: float) -> str:
+    """Format byte count in human readable format"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if bytes_size < 1024.0:
+            return f"{bytes_size:.1f} {unit}"
+        bytes_size /= 1024.0
+    return f"{bytes_size:.1f} TB"
+
+
+class ConnectionPool:
+    """Fixed-size pool of keep-alive HTTP connections to one server"""
+
+    def __init__(self, server: str, size: int, timeout: float = 60):
+        parts = urlsplit(server)
+        connection_class = (http.client.HTTPSConnection if parts.scheme == "https"
+                            else http.client.HTTPConnection)
+        # Connections open lazily on first use and stay open between requests
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(connection_class(parts.hostname, parts.port, timeout=timeout))
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        """Send a request and return (connection, response); call release() when done"""
+        connection = self._idle.get()
+        try:
+            if connection.sock is not None and connection_dropped(connection.sock):
+                # The server closed this idle keep-alive connection; a closed
+                # HTTPConnection reconnects on the next request
+                connection.close()
+            sent = False
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                sent = True
+                return connection, connection.getresponse()
+            except (ConnectionError, http.client.CannotSendRequest):
+                # Resending is only safe if the server can't have acted on the
+                # request: it was never fully sent, or repeating it is harmless
+                if sent and method not in IDEMPOTENT_METHODS:
+                    raise
+                connection.close()
+                if hasattr(body, "rewind"):
+                    body.rewind()
+                connection.request(method, path, body=body, headers=headers or {})
+                return connection, connection.getresponse()
+        except Exception:
+            connection.close()
+            self._idle.put(connection)
+            raise
+
+    def release(self, connection: http.client.HTTPConnection, response: http.client.HTTPResponse) -> None:
+        # The response must be fully read before the connection can be reused
+        if not response.isclosed():
+            response.read()
+        if response.will_close:
+            connection.close()
+        self._idle.put(connection)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+def connection_dropped(sock) -> bool:
+    """Check whether the server closed an idle connection (its socket reads EOF)"""
+    readable, _, _ = select.select([sock], [], [], 0)
+    return bool(readable)
+
+
+class MultipartFileBody:
+    """File-like multipart/form-data body streamed from disk"""
+
+    def __init__(self, path: str, password: Optional[str]):
+        self.boundary = uuid.uuid4().hex
+        filename = os.path.basename(path).replace('"', "%22")
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        preamble = b""
+        if password:
+            preamble += (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="file_password"\r\n\r\n'
+                f"{password}\r\n"
+            ).encode()
+        preamble += (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        self._preamble = preamble
+        self._epilogue = f"\r\n--{self.boundary}--\r\n".encode()
+        self._path = path
+        self.length = len(preamble) + os.path.getsize(path) + len(self._epilogue)
+        self.sha256 = hashlib.sha256()
+        self._file = None
+
+    def rewind(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size: int = CHUNK_SIZE) -> bytes:
+        # http.client calls read() until it returns b""
+        if self._file is None:
+            self._file = open(self._path, "rb")
+            self._stage = 0
+        if self._stage == 0:
+            self._stage = 1
+            return self._preamble
+        if self._stage == 1:
+            chunk = self._file.read(CHUNK_SIZE)
+            if chunk:
+                self.sha256.update(chunk)
+                return chunk
+            self._stage = 2
+            return self._epilogue
+        self._file.close()
+        return b""
+
+
+class Transfers:
+    """Runs uploads and downloads in parallel and tracks throughput"""
+
+    def __init__(self, server: str, concurrency: int, quiet: bool = False, owner_key: Optional[str] = None):
+        self.server = server.rstrip("/")
+        # One owner key for the whole batch, so it can be listed and revoked together
+        self.owner_key = owner_key or secrets.token_urlsafe(24)
+        self.concurrency = concurrency
+        self.quiet = quiet
+        self.pool = ConnectionPool(self.server, concurrency)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._done = 0
+        self._start = time.perf_counter()
+
+    def _progress(self, transferred: int, total: int) -> None:
+        with self._lock:
+            self._bytes += transferred
+            self._done += 1
+            elapsed = time.perf_counter() - self._start
+            if not self.quiet:
+                print(f"\r   {self._done}/{total} files, {format_size(self._bytes)}, "
+                      f"{format_size(self._bytes / elapsed if elapsed else 0)}/s",
+                      end="", file=sys.stderr, flush=True)
+
+    def upload_one(self, path: str, password: Optional[str], total: int) -> dict:
+        body = MultipartFileBody(path, password)
+        connection, response = self.pool.request("POST", "/upload", body=body, headers={
+            "Content-Type": f"multipart/form-data; boundary={body.boundary}",
+            "Content-Length": str(body.length),
+            "Accept": "application/json",
+            "X-Owner-Key": self.owner_key,
+        })
+        try:
+            payload = response.read()
+            if response.status != 200:
+                raise TransferError(f"{response.status}: {payload.decode(errors='replace')}")
+            result = json.loads(payload)
+        finally:
+            self.pool.release(connection, response)
+
+        if result["digests"]["sha-256"] != body.sha256.hexdigest():
+            raise TransferError("Server digest doesn't match the uploaded file")
+        self._progress(result["size"], total)
+        return {
+            "path": path,
+            "token": result["token"],
+            "download_url": f"{self.server}/download/{result['token']}",
+            "size": result["size"],
+            "sha256": result["digests"]["sha-256"],
+            "expires_at": result["expires_at"],
+        }
+
+    def download_one(self, token: str, output_dir: str, password: Optional[str], total: int) -> dict:
+        path = f"/download/{quote(token)}"
+        if password:
+            path += f"?password={quote(password)}"
+        connection, response = self.pool.request("GET", path)
+        # Downloads land in a hidden file and only take their name once
+        # verified, so a failed or corrupt transfer never looks complete
+        temp = os.path.join(output_dir, f".share-{uuid.uuid4().hex}.part")
+        try:
+            try:
+                if response.status != 200:
+                    raise TransferError(f"{response.status}: {response.read().decode(errors='replace')}")
+
+                filename = parse_filename(response.getheader("Content-Disposition", "")) or token
+                sha256 = hashlib.sha256()
+                size = 0
+                with open(temp, "xb") as f:
+                    while chunk := response.read(CHUNK_SIZE):
+                        sha256.update(chunk)
+                        f.write(chunk)
+                        size += len(chunk)
+                expected = parse_repr_digest(response.getheader("Repr-Digest", ""))
+            finally:
+                self.pool.release(connection, response)
+
+            if expected is not None and expected != sha256.digest():
+                raise TransferError(f"Digest mismatch for {filename}")
+            target = move_unique(temp, output_dir, filename)
+        except BaseException:
+            try:
+                os.unlink(temp)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self._progress(size, total)
+        return {
+            "token": token,
+            "path": target,
+            "size": size,
+            "sha256": sha256.hexdigest(),
+            "verified": expected is not None,
+        }
+
+    def run(self, func, items: List, *args) -> List[dict]:
+        """Apply func to every item in parallel, collecting per-item errors"""
+        def attempt(item):
+            try:
+                return func(item, *args, len(items))
+            except (TransferError, OSError, http.client.HTTPException, ValueError, KeyError) as e:
+                return {"item": item, "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(attempt, items))
+        if not self.quiet and items:
+            print(file=sys.stderr)
+        return results
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self._start
+        return {
+            "files": self._done,
+            "bytes": self._bytes,
+            "seconds": round(elapsed, 3),
+            "bytes_per_second": round(self._bytes / elapsed) if elapsed else 0,
+        }
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def parse_filename(content_disposition: str) -> Optional[str]:
+    """Extract a safe file name from a Content-Disposition header"""
+    for part in content_disposition.split(";"):
+        name, _, value = part.strip().partition("=")
+        if name.lower() == "filename" and value:
+            filename = os.path.basename(value.strip('"'))
+            return filename if filename not in ("", ".", "..") else None
+    return None
+
+
+def create_unique(directory: str, filename: str):
+    """Create a new file for writing, adding " (n)" to the name if it's taken
+
+    Returns (path, file). Parallel downloads of files with the same name each
+    get their own file instead of overwriting one another.
+    """
+    stem, ext = os.path.splitext(filename)
+    counter = 0
+    while True:
+        name = filename if counter == 0 else f"{stem} ({counter}){ext}"
+        path = os.path.join(directory, name)
+        try:
+            return path, open(path, "xb")
+        except FileExistsError:
+            counter += 1
+
+
+def move_unique(source: str, directory: str, filename: str) -> str:
+    """Move a file into directory, adding " (n)" to the name if it's taken
+
+    The name is reserved by create_unique() before the file is moved over it,
+    so an existing file is never replaced.
+    """
+    path, placeholder = create_unique(directory, filename)
+    placeholder.close()
+    try:
+        os.replace(source, path)
+    except OSError:
+        os.unlink(path)
+        raise
+    return path
+
+
+def parse_repr_digest(header: str) -> Optional[bytes]:
+    """Extract the raw SHA-256 digest from a Repr-Digest header"""
+    for part in header.split(","):
+        algorithm, _, value = part.strip().partition("=")
+        if algorithm == "sha-256" and value.startswith(":") and value.endswith(":"):
+            return base64.b64decode(value[1:-1])
+    return None
+
+
+def expand_paths(patterns: List[str]) -> List[str]:
+    """Expand files, directories (recursively) and glob patterns into file paths"""
+    paths = []
+    for pattern in patterns:
+        matches = [pattern] if os.path.exists(pattern) else sorted(glob.glob(pattern, recursive=True))
+        for match in matches:
+            if os.path.isdir(match):
+                for root, _, filenames in os.walk(match):
+                    paths.extend(os.path.join(root, name) for name in sorted(filenames))
+            elif os.path.isfile(match):
+                paths.append(match)
+    # A file matched by several patterns is uploaded once
+    return list(dict.fromkeys(os.path.normpath(path) for path in paths))
+
+
+def token_from(value: str) -> str:
+    """Accept either a bare token or a full download URL"""
+    if "/download/" in value:
+        return value.split("/download/")[-1].split("?")[0]
+    return value
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Batch upload and download for Secure File Share")
+    parser.add_argument("--server", default=os.getenv("SHARE_SERVER", DEFAULT_SERVER),
+                        help=f"Server base URL (default: {DEFAULT_SERVER})")
+    parser.add_argument("-j", "--concurrency", type=int, default=4,
+                        help="Parallel transfers and pooled connections (default: 4)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Don't print progress to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    upload = commands.add_parser("upload", help="Upload files, directories or glob patterns")
+    upload.add_argument("paths", nargs="+")
+    upload.add_argument("--password", help="Password required to download the files")
+    upload.add_argument("--owner-key", default=os.getenv("SHARE_OWNER_KEY"),
+                        help="Owner key for listing and revoking the uploads (default: a new random key)")
+
+    download = commands.add_parser("download", help="Download files by token or URL")
+    download.add_argument("tokens", nargs="+")
+    download.add_argument("-o", "--output-dir", default=".")
+    download.add_argument("--password", help="File password")
+
+    args = parser.parse_args(argv)
+    transfers = Transfers(args.server, max(1, args.concurrency), quiet=args.quiet,
+                          owner_key=getattr(args, "owner_key", None))
+    try:
+        if args.command == "upload":
+            paths = expand_paths(args.paths)
+            if not paths:
+                parser.error("No files matched")
+            results = transfers.run(transfers.upload_one, paths, args.password)
+        else:
+            os.makedirs(args.output_dir, exist_ok=True)
+            tokens = [token_from(value) for value in args.tokens]
+            results = transfers.run(transfers.download_one, tokens, args.output_dir, args.password)
+    finally:
+        transfers.close()
+
+    summary = transfers.summary()
+    if args.command == "upload":
+        summary["owner_key"] = transfers.owner_key
+    print(json.dumps({"results": results, "summary": summary}, indent=2))
+    return 1 if any("error" in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
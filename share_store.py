@@ -0,0 +1,218 @@
+"""
+Compact in-memory storage for shared files.
+
+Each share is kept as a slotted ``Share`` record keyed by the 16 raw bytes of
+its token, with epoch-second timestamps instead of ``datetime`` objects.
+``ShareStore`` keeps secondary indexes by owner IP and by expiry so that
+per-owner lookups and expiry sweeps don't have to scan every entry.
+"""
+
+import sys
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+EXPIRY_BUCKET_SECONDS = 60
+
+
+def token_to_key(token: str) -> Optional[bytes]:
+    """Convert a URL token to its 16-byte storage key (None if malformed)"""
+    # Only the canonical lowercase uuid form is handed out, so parse it directly
+    # rather than going through uuid.UUID on every request
+    if len(token) != 36 or token[8] != "-" or token[13] != "-" or token[18] != "-" or token[23] != "-":
+        return None
+    digits = token.replace("-", "")
+    try:
+        key = bytes.fromhex(digits)
+    except ValueError:
+        return None
+    # fromhex also accepts uppercase and skips whitespace; round-tripping
+    # rejects every spelling but the canonical one
+    return key if key.hex() == digits else None
+
+
+def key_to_token(key: bytes) -> str:
+    """Convert a 16-byte storage key back to its URL token"""
+    h = key.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+class Share:
+    """Metadata and content of a single shared file"""
+
+    __slots__ = (
+        "owner_ip",
+        "filename",
+        "content",
+        "content_type",
+        "uploaded_at",
+        "expires_at",
+        "file_password",
+        "sha256",
+        "blake2b",
+        "owner_key",
+    )
+
+    def __init__(
+        self,
+        owner_ip: str,
+        filename: str,
+        content: bytes,
+        content_type: str,
+        uploaded_at: int,
+        expires_at: int,
+        file_password: Optional[str] = None,
+        sha256: bytes = b"",
+        blake2b: Optional[bytes] = None,
+        owner_key: Optional[str] = None,
+    ):
+        # Owner IPs and content types repeat across many shares, so intern them
+        self.owner_ip = sys.intern(owner_ip)
+        self.filename = filename
+        self.content = content
+        self.content_type = sys.intern(content_type)
+        self.uploaded_at = uploaded_at
+        self.expires_at = expires_at
+        self.file_password = file_password
+        # Raw digests computed while the upload streamed in
+        self.sha256 = sha256
+        self.blake2b = blake2b
+        # Secret proving ownership for listing and revocation; the owner IP
+        # alone is shared by every client behind the same NAT
+        self.owner_key = owner_key
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    def is_expired(self, now: Optional[int] = None) -> bool:
+        """Check whether the share has passed its expiry time"""
+        if now is None:
+            now = int(time.time())
+        return self.expires_at < now
+
+
+class ShareStore:
+    """Token -> Share mapping with owner and expiry indexes"""
+
+    def __init__(self):
+        self._shares: Dict[bytes, Share] = {}
+        self._by_owner: Dict[str, Set[bytes]] = {}
+        self._owner_bytes: Dict[str, int] = {}
+        # Keys bucketed by expiry minute; keys of removed shares are skipped lazily
+        self._expiry_buckets: Dict[int, List[bytes]] = {}
+        self._total_bytes = 0
+        self._removal_listeners: List[Callable[[str, Share], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._shares)
+
+    def __contains__(self, token: str) -> bool:
+        key = token_to_key(token)
+        return key is not None and key in self._shares
+
+    def __getitem__(self, token: str) -> Share:
+        share = self.get(token)
+        if share is None:
+            raise KeyError(token)
+        return share
+
+    def __delitem__(self, token: str) -> None:
+        if self.remove(token) is None:
+            raise KeyError(token)
+
+    def __iter__(self) -> Iterator[str]:
+        return (key_to_token(key) for key in self._shares)
+
+    def values(self) -> Iterator[Share]:
+        return iter(self._shares.values())
+
+    @property
+    def total_bytes(self) -> int:
+        """Total size of all stored content, maintained incrementally"""
+        return self._total_bytes
+
+    def add_removal_listener(self, listener: Callable[[str, Share], None]) -> None:
+        """Call listener(token, share) whenever a share is removed or expires"""
+        self._removal_listeners.append(listener)
+
+    def add(self, share: Share) -> str:
+        """Store a share under a fresh token and return the token"""
+        key = uuid.uuid4().bytes
+        while key in self._shares:
+            key = uuid.uuid4().bytes
+
+        self._shares[key] = share
+        self._by_owner.setdefault(share.owner_ip, set()).add(key)
+        self._owner_bytes[share.owner_ip] = self._owner_bytes.get(share.owner_ip, 0) + share.size
+        self._expiry_buckets.setdefault(share.expires_at // EXPIRY_BUCKET_SECONDS, []).append(key)
+        self._total_bytes += share.size
+        return key_to_token(key)
+
+    def get(self, token: str) -> Optional[Share]:
+        key = token_to_key(token)
+        if key is None:
+            return None
+        return self._shares.get(key)
+
+    def remove(self, token: str) -> Optional[Share]:
+        """Remove a share by token, returning it if it existed"""
+        key = token_to_key(token)
+        if key is None:
+            return None
+        return self._remove_key(key)
+
+    def _remove_key(self, key: bytes) -> Optional[Share]:
+        share = self._shares.pop(key, None)
+        if share is None:
+            return None
+
+        owned = self._by_owner.get(share.owner_ip)
+        if owned is not None:
+            owned.discard(key)
+            if owned:
+                self._owner_bytes[share.owner_ip] -= share.size
+            else:
+                del self._by_owner[share.owner_ip]
+                del self._owner_bytes[share.owner_ip]
+        self._total_bytes -= share.size
+
+        if self._removal_listeners:
+            token = key_to_token(key)
+            for listener in self._removal_listeners:
+                listener(token, share)
+        return share
+
+    def tokens_for_owner(self, owner_ip: str) -> List[str]:
+        """List the tokens of all shares uploaded by an owner"""
+        return [key_to_token(key) for key in self._by_owner.get(owner_ip, ())]
+
+    def owner_usage(self, owner_ip: str) -> Tuple[int, int]:
+        """Return (file count, total bytes) stored by an owner"""
+        return len(self._by_owner.get(owner_ip, ())), self._owner_bytes.get(owner_ip, 0)
+
+    def pop_expired(self, now: Optional[int] = None) -> List[Tuple[str, Share]]:
+        """Remove and return all shares whose expiry time has passed"""
+        if now is None:
+            now = int(time.time())
+
+        expired = []
+        current_bucket = now // EXPIRY_BUCKET_SECONDS
+        due = [bucket for bucket in self._expiry_buckets if bucket <= current_bucket]
+        for bucket in due:
+            remaining = []
+            for key in self._expiry_buckets.pop(bucket):
+                share = self._shares.get(key)
+                # Skip keys of shares that were already removed
+                if share is None:
+                    continue
+                if share.expires_at < now:
+                    self._remove_key(key)
+                    expired.append((key_to_token(key), share))
+                else:
+                    remaining.append(key)
+            # Only the current bucket can still hold unexpired shares
+            if remaining:
+                self._expiry_buckets[bucket] = remaining
+
+        return expired
@@ -0,0 +1,125 @@
+"""
+Precompressed, fingerprinted static assets.
+
+Every file under the static directory is read once and given a content-hash
+fingerprinted name (``style.css`` -> ``style.1a2b3c4d5e.css``) plus gzip and,
+when the optional ``brotli`` package is installed, brotli variants. Requests
+for fingerprinted names can be cached forever; the right encoding is picked
+from ``Accept-Encoding``.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip alone is still served
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Unfingerprinted names may change on redeploy, so clients must revalidate
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+class Asset:
+    """A static file with its precompressed variants"""
+
+    __slots__ = ("path", "fingerprinted_path", "media_type", "digest", "variants")
+
+    def __init__(self, path: str, content: bytes):
+        digest = hashlib.sha256(content).hexdigest()[:10]
+        stem, ext = os.path.splitext(path)
+        self.path = path
+        self.fingerprinted_path = f"{stem}.{digest}{ext}"
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.digest = digest
+        # Content-Encoding -> body; None is the uncompressed original
+        self.variants: Dict[Optional[str], bytes] = {None: content}
+
+        if self.media_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) < len(content):
+                self.variants["gzip"] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(content, quality=11)
+                if len(compressed) < len(content):
+                    self.variants["br"] = compressed
+
+    def etag(self, encoding: Optional[str]) -> str:
+        """Entity tag for one variant; each encoding is a distinct representation"""
+        if encoding is None:
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+    def select(self, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """Pick the smallest variant the client accepts"""
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return self.variants[encoding], encoding
+        return self.variants[None], None
+
+
+def parse_accept_encoding(header: str) -> set:
+    """Return the content codings a client accepts (ignoring q=0 entries)"""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(coding)
+    if "*" in accepted:
+        accepted.update(("br", "gzip"))
+    return accepted
+
+
+class StaticAssets:
+    """In-memory static file table built on first use"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._assets: Optional[Dict[str, Tuple[Asset, bool]]] = None
+        self._lock = threading.Lock()
+
+    def _build(self) -> Dict[str, Tuple[Asset, bool]]:
+        assets = {}
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                full_path = os.path.join(root, filename)
+                path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    asset = Asset(path, f.read())
+                assets[asset.path] = (asset, False)
+                assets[asset.fingerprinted_path] = (asset, True)
+        return assets
+
+    def _get_assets(self) -> Dict[str, Tuple[Asset, bool]]:
+        if self._assets is None:
+            with self._lock:
+                if self._assets is None:
+                    self._assets = self._build()
+        return self._assets
+
+    def build(self) -> None:
+        """Read and compress all assets now instead of on first request"""
+        self._get_assets()
+
+    def lookup(self, path: str) -> Optional[Tuple[Asset, bool]]:
+        """Find an asset by plain or fingerprinted path: (asset, is_fingerprinted)"""
+        return self._get_assets().get(path)
+
+    def url(self, path: str) -> str:
+        """Fingerprinted URL for a static file, for use in templates"""
+        entry = self.lookup(path)
+        if entry is None:
+            return f"/static/{path}"
+        return f"/static/{entry[0].fingerprinted_path}"
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Tests for upload admission control (queueing, timeouts, 503 and early 413)
+
+Start the server with a single upload slot, a one-entry queue and a short
+queue timeout first:
+    MAX_CONCURRENT_UPLOADS=1 MAX_UPLOAD_QUEUE=1 UPLOAD_QUEUE_TIMEOUT=2 python main.py
+"""
+
+import http.client
+import secrets
+import threading
+import time
+
+import requests
+
+# Test configuration
+HOST = "localhost"
+PORT = 8000
+BASE_URL = f"http://{HOST}:{PORT}"
+BOUNDARY = "admission-test-boundary"
+# Owner key sent with uploads so the tests can revoke them afterwards
+OWNER_KEY = secrets.token_urlsafe(24)
+
+class HeldUpload:
+    """An upload whose body is only sent on finish(), holding an upload slot until then"""
+
+    def __init__(self, filename: str = "held.txt"):
+        self.body = (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f"Content-Type: text/plain\r\n\r\n"
+            f"held upload content\r\n"
+            f"--{BOUNDARY}--\r\n"
+        ).encode()
+        self.connection = http.client.HTTPConnection(HOST, PORT, timeout=30)
+        self.connection.putrequest("POST", "/upload")
+        self.connection.putheader("Content-Type", f"multipart/form-data; boundary={BOUNDARY}")
+        self.connection.putheader("Content-Length", str(len(self.body)))
+        self.connection.putheader("Accept", "application/json")
+        self.connection.putheader("X-Owner-Key", OWNER_KEY)
+        # Headers alone are enough for the server to admit the upload
+        self.connection.endheaders()
+        if not wait_for_admission('in_flight', 1):
+            self.connection.close()
+            raise RuntimeError("Held upload was not admitted")
+
+    def finish(self) -> int:
+        """Send the body and return the response status"""
+        try:
+            self.connection.send(self.body)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        finally:
+            self.connection.close()
+
+def upload_small(filename: str) -> requests.Response:
+    """Upload a tiny file, asking for a JSON response"""
+    files = {'file': (filename, b'queued upload content', 'text/plain')}
+    return requests.post(f"{BASE_URL}/upload", files=files, headers={'Accept': 'application/json', 'X-Owner-Key': OWNER_KEY})
+
+def get_admission() -> dict:
+    return requests.get(f"{BASE_URL}/status").json()['upload_admission']
+
+def wait_for_admission(key: str, value: int, timeout: float = 5) -> bool:
+    """Poll /status until an upload_admission counter reaches a value"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if get_admission()[key] == value:
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_server_config():
+    """Check that the server runs with the admission limits these tests need"""
+    print("📊 Checking upload admission settings...")
+    try:
+        admission = get_admission()
+    except requests.exceptions.ConnectionError:
+        print(f"❌ Cannot connect to server. Make sure it's running on {BASE_URL}")
+        return None
+
+    if admission['max_in_flight'] != 1 or admission['max_queue_depth'] != 1:
+        print("❌ Restart the server with MAX_CONCURRENT_UPLOADS=1 MAX_UPLOAD_QUEUE=1 UPLOAD_QUEUE_TIMEOUT=2")
+        return None
+    print(f"✅ 1 upload slot, queue of 1, {admission['queue_timeout_seconds']}s queue timeout")
+    return admission
+
+def test_early_rejection():
+    """Test that an oversized Content-Length gets 413 before any body is sent"""
+    print(f"\n🚫 Testing early 413 for oversized uploads...")
+
+    connection = http.client.HTTPConnection(HOST, PORT, timeout=10)
+    try:
+        connection.putrequest("POST", "/upload")
+        connection.putheader("Content-Type", f"multipart/form-data; boundary={BOUNDARY}")
+        connection.putheader("Content-Length", str(10 * 1024 * 1024 * 1024))  # 10GB, never sent
+        connection.endheaders()
+        response = connection.getresponse()
+        response.read()
+
+        if response.status == 413:
+            print("✅ Oversized upload rejected (413) without reading the body")
+            return True
+        else:
+            print(f"❌ Expected 413, got {response.status}")
+            return False
+
+    except Exception as e:
+        print(f"❌ Error testing early rejection: {e}")
+        return False
+    finally:
+        connection.close()
+
+def test_queued_upload():
+    """Test that an upload waits for a busy slot and then succeeds"""
+    print(f"\n⏳ Testing queued upload...")
+
+    held = HeldUpload()
+    results = []
+    thread = threading.Thread(target=lambda: results.append(upload_small("queued.txt")))
+    try:
+        thread.start()
+        if not wait_for_admission('queue_depth', 1):
+            print("❌ Second upload was not queued")
+            return False
+        print("✅ Second upload is waiting in the queue")
+
+        status = held.finish()
+        thread.join()
+        if status != 200 or results[0].status_code != 200:
+            print(f"❌ Expected both uploads to succeed, got {status} and {results[0].status_code}")
+            return False
+        print("✅ Queued upload was admitted once the slot freed up")
+
+        admission_after = get_admission()
+        if admission_after['max_wait_ms'] <= 0:
+            print("❌ Queue wait time was not recorded")
+            return False
+        print(f"✅ /status reports a max queue wait of {admission_after['max_wait_ms']} ms")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error testing queued upload: {e}")
+        return False
+    finally:
+        held.connection.close()
+        thread.join()
+        requests.delete(f"{BASE_URL}/shares", headers={'X-Owner-Key': OWNER_KEY})
+
+def test_queue_timeout():
+    """Test that a queued upload gets 503 with Retry-After once its wait times out"""
+    print(f"\n⌛ Testing queue timeout...")
+
+    admission = get_admission()
+    held = HeldUpload()
+    try:
+        start = time.monotonic()
+        response = upload_small("timeout.txt")
+        waited = time.monotonic() - start
+
+        if response.status_code != 503:
+            print(f"❌ Expected 503, got {response.status_code}")
+            return False
+        if 'Retry-After' not in response.headers:
+            print("❌ 503 response has no Retry-After header")
+            return False
+        if waited < admission['queue_timeout_seconds']:
+            print(f"❌ Rejected after {waited:.2f}s, before the queue timeout")
+            return False
+        print(f"✅ Rejected after {waited:.2f}s with Retry-After: {response.headers['Retry-After']}")
+        print(f"   Response: {response.json().get('detail', 'No detail')}")
+
+        if held.finish() != 200:
+            print("❌ Held upload failed")
+            return False
+        return True
+
+    except Exception as e:
+        print(f"❌ Error testing queue timeout: {e}")
+        return False
+    finally:
+        held.connection.close()
+        requests.delete(f"{BASE_URL}/shares", headers={'X-Owner-Key': OWNER_KEY})
+
+def test_queue_full():
+    """Test that uploads beyond the queue length are turned away immediately"""
+    print(f"\n📛 Testing full upload queue...")
+
+    admission = get_admission()
+    held = HeldUpload()
+    results = []
+    thread = threading.Thread(target=lambda: results.append(upload_small("queued.txt")))
+    try:
+        thread.start()
+        if not wait_for_admission('queue_depth', 1):
+            print("❌ Second upload was not queued")
+            return False
+
+        start = time.monotonic()
+        response = upload_small("overflow.txt")
+        waited = time.monotonic() - start
+        if response.status_code != 503 or 'Retry-After' not in response.headers:
+            print(f"❌ Expected 503 with Retry-After, got {response.status_code}")
+            return False
+        if waited >= admission['queue_timeout_seconds']:
+            print(f"❌ Rejection took {waited:.2f}s; a full queue should reject at once")
+            return False
+        print(f"✅ Third upload rejected immediately ({waited:.2f}s)")
+
+        held.finish()
+        thread.join()
+        if results[0].status_code != 200:
+            print(f"❌ Queued upload failed with {results[0].status_code}")
+            return False
+        print("✅ Queued upload still succeeded")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error testing full queue: {e}")
+        return False
+    finally:
+        held.connection.close()
+        thread.join()
+        requests.delete(f"{BASE_URL}/shares", headers={'X-Owner-Key': OWNER_KEY})
+
+def main():
+    """Run all tests"""
+    print("🧪 Testing Upload Admission Control")
+    print("=" * 60)
+
+    admission = test_server_config()
+    if not admission:
+        return
+
+    tests = [
+        ("Early 413", test_early_rejection),
+        ("Queued Upload", test_queued_upload),
+        ("Queue Timeout", test_queue_timeout),
+        ("Queue Full", test_queue_full),
+    ]
+
+    results = {}
+    for test_name, test_func in tests:
+        print(f"\n{'='*20} {test_name} {'='*20}")
+        try:
+            results[test_name] = test_func()
+        except Exception as e:
+            print(f"❌ Test failed with exception: {e}")
+            results[test_name] = False
+
+    # Print summary
+    print(f"\n{'='*60}")
+    print("📋 TEST SUMMARY")
+    print(f"{'='*60}")
+
+    passed = sum(1 for success in results.values() if success)
+    for test_name, success in results.items():
+        status = "✅ PASS" if success else "❌ FAIL"
+        print(f"{status} {test_name}")
+
+    print(f"\n🎯 Results: {passed}/{len(results)} tests passed")
+
+    if passed == len(results):
+        print("🎉 All admission tests passed!")
+    else:
+        print("⚠️ Some tests failed. Check the output above for details.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Tests for the mmap payload arena and the arena upload/download paths
+"""
+
+import asyncio
+import os
+import time
+
+import httpx
+from starlette.requests import Request
+
+import main
+from arena import RELEASE_ADVICE, PayloadArena
+from share_store import Share
+
+KB = 1024
+
+
+def stored_bytes(block) -> int:
+    """Bytes of backing storage the kernel holds for a block's region"""
+    return os.fstat(block._region.fd).st_blocks * 512
+
+
+def test_slot_reuse_after_free():
+    """A freed slot is handed out again for the next payload of its size class"""
+    print("♻️ Testing slot reuse after free...")
+    arena = PayloadArena(slab_size=64 * KB, large_threshold=16 * KB)
+    first = arena.allocate(1000)
+    second = arena.allocate(1000)
+    assert first.offset != second.offset
+
+    arena.free(first)
+    reused = arena.allocate(900)
+    assert reused._region is first._region and reused.offset == first.offset
+    assert arena.stats()["used_bytes"] == 1000 + 900
+    print("✅ Freed slot was reused")
+
+
+def test_deferred_free_while_view_open():
+    """A slot with an open reader view is only recycled once the view is released"""
+    print("🔒 Testing deferred free while a view is open...")
+    arena = PayloadArena(slab_size=64 * KB, large_threshold=16 * KB)
+    block = arena.allocate(1000)
+    block.write(0, b"A" * 1000)
+    view = block.open_view()
+
+    arena.free(block)
+    assert arena.stats()["pending_frees"] == 1
+    try:
+        block.open_view()
+        assert False, "open_view() succeeded on a freed block"
+    except ValueError:
+        pass
+
+    other = arena.allocate(1000)
+    other.write(0, b"B" * 1000)
+    assert other.offset != block.offset, "Slot reused while a reader still had it open"
+    assert view.tobytes() == b"A" * 1000
+
+    view.release()
+    arena.reclaim()
+    assert arena.stats()["pending_frees"] == 0
+    assert arena.allocate(1000).offset == block.offset
+    print("✅ Slot was recycled only after the view was released")
+
+
+def test_madvise_release():
+    """Freed slots hand their pages back to the OS and large regions are unmapped"""
+    print("📉 Testing page release on free...")
+    arena = PayloadArena(slab_size=1024 * KB, large_threshold=256 * KB)
+    keep = arena.allocate(200 * KB)  # Keeps the slab mapped
+    block = arena.allocate(200 * KB)
+    block.write(0, b"x" * (200 * KB))
+    before = stored_bytes(block)
+    assert before >= 200 * KB
+
+    arena.free(block)
+    if RELEASE_ADVICE is not None:
+        assert stored_bytes(block) <= before - 192 * KB, "Slot pages were not released"
+
+    large = arena.allocate(2 * 1024 * KB)
+    large.write(0, b"y" * (2 * 1024 * KB))
+    assert arena.stats()["large_regions"] == 1
+    arena.free(large)
+    assert arena.stats()["large_regions"] == 0
+    arena.free(keep)
+    assert arena.stats()["used_bytes"] == 0
+    print("✅ Pages released and large region unmapped")
+
+
+def test_shared_block_outlives_free():
+    """Another process's path to a block keeps its bytes after the block is freed"""
+    print("📎 Testing shared blocks across a free...")
+    arena = PayloadArena(slab_size=64 * KB, large_threshold=16 * KB)
+    for size in (1000, 32 * KB):  # A slab slot and a dedicated region
+        block = arena.allocate(size)
+        block.write(0, b"A" * size)
+        shared = block.open_shared()
+        if shared is None:
+            print("⚠️ No /proc on this system, skipping")
+            return
+
+        arena.free(block)
+        other = arena.allocate(size)
+        other.write(0, b"B" * size)
+        with open(shared.path, "rb") as f:
+            f.seek(shared.offset)
+            assert f.read(shared.length) == b"A" * size, "Shared block was reused before it was closed"
+
+        shared.close()
+        arena.reclaim()
+        arena.free(other)
+        assert arena.stats()["pending_frees"] == 0 and arena.stats()["used_bytes"] == 0
+    print("✅ Shared blocks kept their bytes until closed")
+
+
+def store(data: bytes, owner_ip: str) -> str:
+    """Store a payload in main's arena the way upload_file does"""
+    block = main.payload_arena.allocate(len(data))
+    block.write(0, data)
+    now = int(time.time())
+    return main.files.add(Share(owner_ip, "file.txt", block, "text/plain", now, now + 3600))
+
+
+def test_download_racing_delete():
+    """A download keeps its bytes even if the share is deleted and its slot reused"""
+    print("🏁 Testing download racing a delete...")
+    arena = main.payload_arena
+    main.payload_arena = PayloadArena()
+
+    async def run():
+        token = store(b"A" * 1000, "10.0.0.1")
+        request = Request({"type": "http", "method": "GET", "headers": [], "path": "/", "query_string": b""})
+        response = await main.download_file(request, token, None)
+
+        # The owner revokes the share before the body starts streaming, and
+        # another owner's upload lands in the same size class
+        main.files.remove(token)
+        store(b"SECRET" * 166, "10.0.0.2")
+
+        body = b""
+        async for chunk in response.body_iterator:
+            body += bytes(chunk)
+        return body
+
+    try:
+        body = asyncio.run(run())
+        assert body == b"A" * 1000, f"Download returned other data: {body[:24]!r}"
+    finally:
+        for token in list(main.files):
+            main.files.remove(token)
+        main.payload_arena = arena
+    print("✅ Download streamed the deleted share's own bytes")
+
+
+def test_concurrent_uploads_respect_quota():
+    """Concurrent arena uploads from one owner can't overshoot the per-device quota"""
+    print("📏 Testing concurrent uploads against the quota...")
+    arena, owner_memory = main.payload_arena, main.MAX_OWNER_MEMORY
+    main.payload_arena = PayloadArena()
+    main.MAX_OWNER_MEMORY = 3 * 1024 * KB
+    size = 1536 * KB
+
+    async def upload(client, i):
+        files = {"file": (f"quota_{i}.bin", os.urandom(size), "application/octet-stream")}
+        return await client.post("/upload", files=files, headers={"Accept": "application/json"})
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(upload(client, i) for i in range(4)))
+
+    try:
+        responses = asyncio.run(run())
+        statuses = sorted(response.status_code for response in responses)
+        assert statuses == [200, 200, 429, 429], statuses
+        assert main.files.total_bytes <= main.MAX_OWNER_MEMORY
+        assert main.payload_arena.stats()["used_bytes"] == main.files.total_bytes
+    finally:
+        for token in list(main.files):
+            main.files.remove(token)
+        main.payload_arena, main.MAX_OWNER_MEMORY = arena, owner_memory
+    print("✅ Only uploads within the quota were stored, rejected blocks were freed")
+
+
+if __name__ == "__main__":
+    test_slot_reuse_after_free()
+    test_deferred_free_while_view_open()
+    test_madvise_release()
+    test_shared_block_outlives_free()
+    test_download_racing_delete()
+    test_concurrent_uploads_respect_quota()
+    print("🎉 Arena tests passed!")
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+End-to-end test for share_cli.py against a locally started server
+"""
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import share_cli
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port() -> int:
+    """Ask the OS for an unused TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    """Start main.py and wait until /status responds"""
+    process = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=APP_DIR,
+        env=dict(os.environ, PORT=str(port)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/status"):
+                return process
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def run_cli(server: str, *args: str) -> dict:
+    """Run share_cli.py and parse its JSON output"""
+    result = subprocess.run(
+        [sys.executable, "share_cli.py", "--server", server, "--quiet", *args],
+        cwd=APP_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def test_cli_round_trip():
+    """Upload a directory tree with the CLI and download it back"""
+    print("🔄 Testing CLI batch upload and download...")
+    port = free_port()
+    server = f"http://127.0.0.1:{port}"
+    process = start_server(port)
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            source = os.path.join(workdir, "source")
+            os.makedirs(os.path.join(source, "nested"))
+            originals = {
+                "random.bin": os.urandom(3 * 1024 * 1024 + 17),
+                "notes.txt": b"Hello from the command-line client!",
+                os.path.join("nested", "empty.txt"): b"",
+                # Same basename as the top-level file, downloaded in parallel
+                os.path.join("nested", "notes.txt"): b"Nested notes with the same name",
+            }
+            for name, content in originals.items():
+                with open(os.path.join(source, name), "wb") as f:
+                    f.write(content)
+
+            uploaded = run_cli(server, "-j", "3", "upload", source, "--password", "cli-pass")
+            assert not any("error" in r for r in uploaded["results"]), uploaded
+            assert uploaded["summary"]["files"] == len(originals)
+            print(f"✅ Uploaded {uploaded['summary']['files']} files")
+
+            # Content types are guessed from file names rather than sent as octet-stream
+            notes = next(r for r in uploaded["results"] if r["path"].endswith("notes.txt"))
+            request = urllib.request.Request(f"{notes['download_url']}?password=cli-pass", method="HEAD")
+            with urllib.request.urlopen(request) as response:
+                assert response.headers["Content-Type"].startswith("text/plain"), response.headers["Content-Type"]
+            print("✅ Content type detected from the file name")
+
+            # The batch shares one owner key, which lists all of its uploads
+            request = urllib.request.Request(f"{server}/shares",
+                                             headers={"X-Owner-Key": uploaded["summary"]["owner_key"]})
+            with urllib.request.urlopen(request) as response:
+                listed = {share["token"] for share in json.load(response)["shares"]}
+            assert listed == {r["token"] for r in uploaded["results"]}, listed
+            print("✅ Uploads listed under the batch's owner key")
+
+            output = os.path.join(workdir, "output")
+            tokens = [r["token"] for r in uploaded["results"]]
+            downloaded = run_cli(server, "-j", "4", "download", *tokens, "-o", output, "--password", "cli-pass")
+            assert not any("error" in r for r in downloaded["results"]), downloaded
+            assert all(r["verified"] for r in downloaded["results"])
+
+            sources = {r["token"]: os.path.relpath(r["path"], source) for r in uploaded["results"]}
+            targets = [r["path"] for r in downloaded["results"]]
+            assert len(set(targets)) == len(originals), "Downloads overwrote each other"
+            for result in downloaded["results"]:
+                name = sources[result["token"]]
+                with open(result["path"], "rb") as f:
+                    assert f.read() == originals[name], f"{name} doesn't match"
+            assert not any(name.endswith(".part") for name in os.listdir(output)), os.listdir(output)
+            print("✅ Downloaded files match and Repr-Digest verified")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+class CorruptDownloadHandler(BaseHTTPRequestHandler):
+    """Serves a file whose Repr-Digest doesn't match its body"""
+
+    def do_GET(self):
+        body = b"corrupted in transit"
+        digest = base64.b64encode(hashlib.sha256(b"original").digest()).decode()
+        self.send_response(200)
+        self.send_header("Content-Disposition", 'attachment; filename="report.txt"')
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Repr-Digest", f"sha-256=:{digest}:")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_corrupt_download_leaves_no_file():
+    """A download failing digest verification leaves no file and keeps existing ones"""
+    print("🧹 Testing failed download cleanup...")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CorruptDownloadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    transfers = share_cli.Transfers(f"http://127.0.0.1:{server.server_address[1]}", 1, quiet=True)
+    try:
+        with tempfile.TemporaryDirectory() as output:
+            with open(os.path.join(output, "report.txt"), "wb") as f:
+                f.write(b"existing")
+            results = transfers.run(transfers.download_one, ["token"], output, None)
+            assert "Digest mismatch" in results[0].get("error", ""), results
+            assert os.listdir(output) == ["report.txt"], os.listdir(output)
+            with open(os.path.join(output, "report.txt"), "rb") as f:
+                assert f.read() == b"existing"
+    finally:
+        transfers.close()
+        server.shutdown()
+        server.server_close()
+    print("✅ Corrupt download removed, existing file untouched")
+
+
+if __name__ == "__main__":
+    test_cli_round_trip()
+    test_corrupt_download_leaves_no_file()
+    print("🎉 CLI test passed!")
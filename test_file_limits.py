@@ -6,6 +6,7 @@ Comprehensive test suite for file size limits and functionality
 import requests
 import json
 import os
+import secrets
 import tempfile
 import time
 import threading
@@ -14,6 +15,8 @@ from io import BytesIO
 # Test configuration
 BASE_URL = "http://localhost:8000"
 TEST_PASSWORD = "test123"
+# Owner key sent with uploads so the tests can revoke them afterwards
+OWNER_HEADERS = {'X-Owner-Key': secrets.token_urlsafe(24)}
 
 def create_test_file(size_bytes: int, filename: str = "test_file.bin") -> str:
     """Create a test file of specified size"""
@@ -158,10 +161,22 @@ def test_large_file_upload():
         if os.path.exists(test_file_path):
             os.unlink(test_file_path)
 
+def get_limits() -> dict:
+    """Read the server's configured limits from /status"""
+    data = requests.get(f"{BASE_URL}/status").json()
+    return {**data['file_limits'], 'max_total_bytes': data['memory_usage']['max_bytes']}
+
 def test_memory_limit():
     """Test uploading multiple files to test memory limit"""
     print(f"\n💾 Testing memory limit with multiple files...")
     
+    limits = get_limits()
+    if limits['max_owner_memory_bytes'] < limits['max_total_bytes'] or limits['max_owner_files'] < 12:
+        # This client would hit its per-device quota (429) before the server fills up
+        print("⏭️ Skipped: restart the server with MAX_OWNER_MEMORY >= MAX_TOTAL_MEMORY "
+              "and MAX_OWNER_FILES >= 12 to test the total memory limit")
+        return None
+    
     # Upload multiple 50MB files to test memory limit
     file_size = 50 * 1024 * 1024  # 50MB each
     uploaded_tokens = []
@@ -175,7 +190,7 @@ def test_memory_limit():
             try:
                 with open(test_file_path, 'rb') as f:
                     files = {'file': (f'memory_test_{i}.bin', f, 'application/octet-stream')}
-                    response = requests.post(f"{BASE_URL}/upload", files=files)
+                    response = requests.post(f"{BASE_URL}/upload", files=files, headers=OWNER_HEADERS)
                 
                 if response.status_code == 200:
                     # Extract token
@@ -202,6 +217,124 @@ def test_memory_limit():
     except Exception as e:
         print(f"❌ Error testing memory limit: {e}")
         return False
+    finally:
+        # Free this client's quota for the tests that follow
+        requests.delete(f"{BASE_URL}/shares", headers=OWNER_HEADERS)
+
+def test_owner_quota():
+    """Test that one client can't store more than its per-device quota"""
+    print(f"\n👤 Testing per-device storage quota...")
+    
+    limits = get_limits()
+    if limits['max_owner_memory_bytes'] >= limits['max_total_bytes']:
+        # The total memory limit (507) is reached before the quota
+        print("⏭️ Skipped: restart the server with MAX_OWNER_MEMORY < MAX_TOTAL_MEMORY "
+              "to test the per-device quota")
+        return None
+    
+    file_size = 50 * 1024 * 1024  # 50MB each
+    attempts = limits['max_owner_memory_bytes'] // file_size + 2
+    test_file_path = create_test_file(file_size, "quota_test.bin")
+    
+    try:
+        for i in range(attempts):
+            print(f"   Uploading file {i+1}/{attempts} ({format_size(file_size)})...")
+            with open(test_file_path, 'rb') as f:
+                files = {'file': (f'quota_test_{i}.bin', f, 'application/octet-stream')}
+                response = requests.post(f"{BASE_URL}/upload", files=files, headers=OWNER_HEADERS)
+            
+            if response.status_code == 200:
+                print(f"   ✅ File {i+1} uploaded successfully")
+            elif response.status_code == 429:
+                print(f"   ✅ Per-device quota reached at file {i+1} (429 Too Many Requests)")
+                print(f"   Response: {response.json().get('detail', 'No detail')}")
+                break
+            else:
+                print(f"   ❌ Unexpected status code: {response.status_code}")
+                return False
+        else:
+            print("❌ Per-device quota was not reached (unexpected)")
+            return False
+        
+        # Revoking shares frees the quota again
+        requests.delete(f"{BASE_URL}/shares", headers=OWNER_HEADERS)
+        with open(test_file_path, 'rb') as f:
+            files = {'file': ('quota_test_after.bin', f, 'application/octet-stream')}
+            response = requests.post(f"{BASE_URL}/upload", files=files, headers=OWNER_HEADERS)
+        if response.status_code == 200:
+            print("✅ Upload accepted again after deleting shares")
+            return True
+        else:
+            print(f"❌ Expected 200 after deleting shares, got {response.status_code}")
+            return False
+        
+    except Exception as e:
+        print(f"❌ Error testing per-device quota: {e}")
+        return False
+    finally:
+        requests.delete(f"{BASE_URL}/shares", headers=OWNER_HEADERS)
+        if os.path.exists(test_file_path):
+            os.unlink(test_file_path)
+
+def test_share_management():
+    """Test listing and revoking your own shares"""
+    print(f"\n🗂️ Testing share listing and revocation...")
+    
+    # The session keeps the owner cookie set by /upload, like a browser
+    owner = requests.Session()
+    try:
+        files = {'file': ('owned.txt', b'owned content', 'text/plain')}
+        response = owner.post(f"{BASE_URL}/upload", files=files)
+        if response.status_code != 200:
+            print(f"❌ Upload failed with status: {response.status_code}")
+            return False
+        
+        import re
+        token = re.search(r'/download/([a-f0-9-]+)', response.text).group(1)
+        
+        response = owner.get(f"{BASE_URL}/shares")
+        listed = [share['token'] for share in response.json()['shares']]
+        if token not in listed:
+            print("❌ Uploaded file missing from /shares")
+            return False
+        print(f"✅ /shares lists {len(listed)} share(s)")
+
+        # Another client from the same address (e.g. behind the same NAT)
+        response = requests.get(f"{BASE_URL}/shares")
+        if token in [share['token'] for share in response.json()['shares']]:
+            print("❌ /shares listed the share to a client without its owner key")
+            return False
+        response = requests.delete(f"{BASE_URL}/shares/{token}")
+        if response.status_code != 403:
+            print(f"❌ Expected 403 deleting without the owner key, got {response.status_code}")
+            return False
+        requests.delete(f"{BASE_URL}/shares")
+        print("✅ Clients without the owner key can't list or delete the share")
+
+        response = requests.get(f"{BASE_URL}/download/{token.upper()}")
+        if response.status_code != 404:
+            print(f"❌ Non-canonical token spelling returned {response.status_code}")
+            return False
+        print("✅ Only the canonical token spelling is accepted")
+
+        response = owner.delete(f"{BASE_URL}/shares/{token}")
+        if response.status_code != 200:
+            print(f"❌ Delete failed with status: {response.status_code}")
+            return False
+        
+        response = requests.get(f"{BASE_URL}/download/{token}")
+        if response.status_code == 404:
+            print("✅ Deleted share is no longer downloadable")
+            return True
+        else:
+            print(f"❌ Expected 404 after delete, got {response.status_code}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Error testing share management: {e}")
+        return False
+    finally:
+        owner.close()
 
 def test_file_expiry():
     """Test that files expire correctly (shortened for testing)"""
@@ -308,8 +441,10 @@ def main():
         ("Small File Upload", test_small_file_upload),
         ("Large File Upload (Rejection)", test_large_file_upload),
         ("Memory Limit", test_memory_limit),
+        ("Per-Device Quota", test_owner_quota),
         ("File Expiry", test_file_expiry),
         ("Concurrent Uploads", test_concurrent_uploads),
+        ("Share Management", test_share_management),
     ]
     
     results = {}
@@ -336,9 +471,12 @@ def main():
     print(f"{'='*60}")
     
     passed = 0
-    total = len(results)
+    total = sum(1 for success in results.values() if success is not None)
     
     for test_name, success in results.items():
+        if success is None:
+            print(f"⏭️ SKIP {test_name}")
+            continue
         status = "✅ PASS" if success else "❌ FAIL"
         print(f"{status} {test_name}")
         if success:
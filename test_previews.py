@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Tests for image preview rendering limits
+"""
+
+import os
+import struct
+import zlib
+from io import BytesIO
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from arena import ArenaBlock, PayloadArena
+from previews import PreviewError, render_thumbnail
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def oversized_png(width: int, height: int) -> bytes:
+    """A small, valid PNG of a blank RGBA image that decodes to width*height*4 bytes"""
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    compressor = zlib.compressobj(9)
+    rows = bytes((1 + width * 4) * 100)  # 100 rows of a filter byte plus transparent pixels
+    data = b"".join(compressor.compress(rows) for _ in range(height // 100)) + compressor.flush()
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + png_chunk(b"IHDR", header)
+        + png_chunk(b"IDAT", data)
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def upload(client: TestClient, filename: str, content: bytes) -> str:
+    files = {"file": (filename, content, "image/png")}
+    response = client.post("/upload", files=files, headers={"Accept": "application/json"})
+    assert response.status_code == 200, response.text
+    return response.json()["token"]
+
+
+def test_pixel_cap():
+    """Images declaring more than max_pixels are refused before they are decoded"""
+    print("📐 Testing pixel cap...")
+    content = oversized_png(8000, 6000)  # Below PIL's own bomb threshold
+    try:
+        render_thumbnail(content, 320, 40_000_000)
+        assert False, "Rendered an image above the pixel cap"
+    except PreviewError as e:
+        assert "too large" in str(e), e
+    print("✅ Image above the pixel cap was refused")
+
+
+def test_decompression_bomb_warning_is_refused():
+    """PIL's decompression bomb warning fails the render even above the pixel cap"""
+    print("💣 Testing decompression bomb warning...")
+    content = oversized_png(12000, 12000)
+    try:
+        render_thumbnail(content, 320, 10 ** 12)
+        assert False, "Rendered an image PIL flagged as a decompression bomb"
+    except PreviewError:
+        pass
+    print("✅ Decompression bomb warning became a preview error")
+
+
+def test_oversized_image_preview():
+    """An image declaring more pixels than PREVIEW_MAX_PIXELS gets 415, a small one renders"""
+    print("🖼️ Testing preview pixel cap...")
+    small = BytesIO()
+    Image.new("RGB", (640, 480), "red").save(small, format="PNG")
+
+    with TestClient(main.app) as client:
+        try:
+            bomb = upload(client, "bomb.png", oversized_png(12000, 12000))
+            response = client.get(f"/preview/{bomb}")
+            assert response.status_code == 415, response.status_code
+
+            token = upload(client, "small.png", small.getvalue())
+            response = client.get(f"/preview/{token}")
+            assert response.status_code == 200, response.status_code
+            assert Image.open(BytesIO(response.content)).size == (320, 240)
+        finally:
+            for token in list(main.files):
+                main.files.remove(token)
+    print("✅ Oversized image refused, small image previewed")
+
+
+def test_arena_preview_is_mapped():
+    """Arena payloads are mapped by the preview worker instead of copied"""
+    print("🗺️ Testing previews of arena payloads...")
+    arena = main.payload_arena
+    main.payload_arena = PayloadArena(slab_size=64 * 1024, large_threshold=16 * 1024)
+    tobytes = ArenaBlock.tobytes
+
+    def no_copy(block):
+        raise AssertionError("Arena payload was copied for a preview")
+
+    images = []
+    for size, mode in (((50, 40), "RGB"), ((60, 30), "RGBA"), ((300, 200), "RGB")):
+        buffer = BytesIO()
+        Image.frombytes(mode, size, os.urandom(size[0] * size[1] * len(mode))).save(buffer, format="PNG")
+        images.append((buffer.getvalue(), size))
+    assert len(images[0][0]) < 16 * 1024 < len(images[2][0])  # Slab slots and a dedicated region
+
+    ArenaBlock.tobytes = no_copy
+    try:
+        with TestClient(main.app) as client:
+            for i, (content, size) in enumerate(images):
+                token = upload(client, f"arena_{i}.png", content)
+                response = client.get(f"/preview/{token}")
+                assert response.status_code == 200, response.status_code
+                assert Image.open(BytesIO(response.content)).size == size
+            for token in list(main.files):
+                main.files.remove(token)
+        stats = main.payload_arena.stats()
+        assert stats["pending_frees"] == 0 and stats["large_regions"] == 0, stats
+    finally:
+        ArenaBlock.tobytes = tobytes
+        for token in list(main.files):
+            main.files.remove(token)
+        main.payload_arena = arena
+    print("✅ Arena previews rendered without copying, pins released")
+
+
+if __name__ == "__main__":
+    test_pixel_cap()
+    test_decompression_bomb_warning_is_refused()
+    test_oversized_image_preview()
+    test_arena_preview_is_mapped()
+    print("🎉 Preview tests passed!")